@@ -2,6 +2,8 @@
 ASGI config for game project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Lifespan events are handled here so the async healing daemon can run inside
+the ASGI server (see HEALING_DAEMON_IN_ASGI).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from hero.daemon.async_daemon import asgi_lifespan  # noqa: E402 (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await asgi_lifespan(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -51,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hero.middleware.HeroMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +87,23 @@ DATABASES = {
 }
 
 
+# Compute hero HP/MP regeneration on read from elapsed time instead of
+# persisting every tick from the healing daemon
+HERO_LAZY_REGEN = os.environ.get('HERO_LAZY_REGEN', 'False').lower() in ('true', '1', 'yes', 'on')
+
+# Run the asyncio healing daemon inside the ASGI server process (single worker
+# only) instead of the separate healing_daemon.py service
+HEALING_DAEMON_IN_ASGI = os.environ.get('HEALING_DAEMON_IN_ASGI', 'False').lower() in ('true', '1', 'yes', 'on')
+
+# Healing daemon log level, and the fraction (0 to 1) of per-hero regen events
+# it logs; by default only per-tick summaries are logged
+HEALING_DAEMON_LOG_LEVEL = os.environ.get('HEALING_DAEMON_LOG_LEVEL', 'INFO').upper()
+HEALING_DAEMON_LOG_EVENTS = float(os.environ.get('HEALING_DAEMON_LOG_EVENTS', '0'))
+
+# Keeps the daemon command channel of the tests in a temporary directory
+TEST_RUNNER = 'game.test_runner.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,45 @@
+import socket
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with the daemon command channel, spool and status file in a
+    temporary directory, so commands sent by the code under test never reach
+    a developer's daemon, now or later from the spool
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        from hero import windows_tasks
+        from hero.daemon.channel import HAS_UNIX_SOCKETS, DaemonClient
+
+        self._daemon_dir = tempfile.TemporaryDirectory()
+        tmp = Path(self._daemon_dir.name)
+        self._port = None
+        if HAS_UNIX_SOCKETS:
+            address = tmp / 'healing_daemon.sock'
+        else:
+            # A bound port that never listens: connecting is refused
+            self._port = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._port.bind(('127.0.0.1', 0))
+            address = self._port.getsockname()
+        self._daemon_files = mock.patch.multiple(
+            windows_tasks,
+            DAEMON_SOCKET=address,
+            DAEMON_COMMANDS_FILE=tmp / 'daemon_commands.jsonl',
+            DAEMON_STATUS_FILE=tmp / 'daemon_status.json',
+            _client=DaemonClient(address),
+        )
+        self._daemon_files.start()
+
+    def teardown_test_environment(self, **kwargs):
+        self._daemon_files.stop()
+        if self._port is not None:
+            self._port.close()
+        self._daemon_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
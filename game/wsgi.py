@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game.settings')
 
 application = get_wsgi_application()
+
+# Load the HeroClass registry once, before gunicorn --preload forks the workers
+from hero.class_registry import hero_classes  # noqa: E402
+
+hero_classes.preload()
@@ -1,14 +1,12 @@
 """
 Windows-compatible healing daemon for RPG game
-Uses threading instead of Django-RQ to avoid Windows compatibility issues
+Uses a single scheduler thread instead of Django-RQ to avoid Windows compatibility issues
 """
 import os
 import sys
 import django
 import threading
-import time
-import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
 # Add the project directory to Python path
@@ -19,254 +17,357 @@ sys.path.append(str(project_dir))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game.settings')
 django.setup()
 
-from hero.models import Hero
+from hero.daemon.channel import CommandServer
+from hero.daemon.journal import SessionJournal
+from hero.daemon.log import TickSummary, configure_logging, event_logger, logger
+from hero.daemon.metrics import DaemonMetrics, StatusPublisher
+from hero.daemon.scheduler import RegenScheduler
+from hero.daemon.write_buffer import VitalsWriteBuffer
+from hero import clock, windows_tasks
+from hero.models import Hero, lazy_regen_enabled
+from hero.windows_tasks import get_daemon_status
+from django.conf import settings
 from django.db.models import F
 
 
+# Modes that regenerate every hero per tick, without per-hero sessions
+SET_BASED_MODES = ('bulk', 'vectorized')
+
+
 class HealingDaemon:
-    def __init__(self):
-        self.healing_heroes = {}  # {hero_id: {'last_heal': datetime, 'thread': thread}}
-        # {hero_id: {'last_restore': datetime, 'thread': thread}}
-        self.mana_restoring_heroes = {}
+    def __init__(self, state_file=None):
+        self.healing_heroes = {}  # {hero_id: {'last_heal': datetime}}
+        self.mana_restoring_heroes = {}  # {hero_id: {'last_restore': datetime}}
         self.running = True
 
+        # Tick timings, DB statements and rows written, published to the status file
+        self.metrics = DaemonMetrics()
+
+        # One thread drives every regen tick from a heap of due times
+        self.scheduler = RegenScheduler(metrics=self.metrics)
+        self.scheduler.start()
+
+        # Vitals written by ticks are coalesced and flushed at most a second later
+        self.write_buffer = VitalsWriteBuffer(max_delay=1.0, max_size=1000)
+
+        # Seconds to wait before retrying a tick that failed
+        self.retry_interval = 5
+
+        # Heroes reported dirty by web workers wake the passive loop; without
+        # reports it only does a full sweep every sweep_interval seconds
+        self.dirty_heroes = set()
+        self.dirty_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.sweep_interval = 300
+        # Longest wait between stored checkpoints in time-to-full mode
+        self.checkpoint_interval = 60
+        # Our own saves must not notify ourselves (until shutdown)
+        self._notifications = windows_tasks.DAEMON_NOTIFICATIONS
+        windows_tasks.DAEMON_NOTIFICATIONS = False
+
+        # Command channel and status file, started by the long-running modes
+        self.mode = 'oneshot'
+        self.command_address = windows_tasks.DAEMON_SOCKET
+        self.spool_file = windows_tasks.DAEMON_COMMANDS_FILE
+        self.status_file = windows_tasks.DAEMON_STATUS_FILE
+        self.command_server = None
+        self.status_publisher = None
+
         # TODO: replace with hero stat based configuration
         self.heal_interval = 1  # seconds
 
         # mana restoration settings
         self.mana_restore_interval = 1  # seconds
 
-        # File to store healing state (persist across restarts)
-        self.state_file = project_dir / 'healing_state.json'
+        # Sessions persist across restarts: a compacted snapshot plus a journal
+        self.state_file = state_file or project_dir / 'healing_state.json'
+        self.journal = SessionJournal(self.state_file)
         self.load_state()
 
-        print(f"🏥 Healing Daemon started at {datetime.now()}")
+        # Per-hero events are aggregated into one log line per second
+        self.summary = TickSummary()
+
+        logger.info("🏥 Healing Daemon started at %s", clock.now())
 
     def load_state(self):
-        """Load healing state from file"""
-        if self.state_file.exists():
-            try:
-                with open(self.state_file, 'r') as f:
-                    data = json.load(f)
-                    self.healing_heroes = {int(k): v for k, v in data.items()}
-                    print(
-                        f"📄 Loaded healing state for {len(self.healing_heroes)} heroes")
-            except Exception as e:
-                print(f"⚠️  Could not load healing state: {e}")
+        """Load health and mana sessions from the snapshot and journal"""
+        try:
+            sessions = self.journal.load()
+            self.healing_heroes = {
+                hero_id: {'last_heal': at} for hero_id, at in sessions['health'].items()}
+            self.mana_restoring_heroes = {
+                hero_id: {'last_restore': at} for hero_id, at in sessions['mana'].items()}
+            if self.healing_heroes or self.mana_restoring_heroes:
+                logger.info("📄 Loaded %d healing and %d mana sessions",
+                            len(self.healing_heroes), len(self.mana_restoring_heroes))
+        except Exception as e:
+            logger.warning("⚠️  Could not load healing state: %s", e)
+
+    def per_hero_sessions(self):
+        """
+        Whether heroes regenerate through per-hero scheduler sessions. With
+        HERO_LAZY_REGEN, or in a set-based mode (bulk, vectorized), every hero
+        is already regenerated and a session would count its regen twice.
+        """
+        return not lazy_regen_enabled() and self.mode not in SET_BASED_MODES
+
+    def resume_sessions(self):
+        """Schedule ticks for sessions loaded from the saved state"""
+        if not self.per_hero_sessions() and (self.healing_heroes or self.mana_restoring_heroes):
+            # Ticking sessions would double count the lazy or set-based regen
+            logger.info("😴 No per-hero sessions in %s mode: dropping saved regen sessions",
+                        self.mode)
+            self.healing_heroes.clear()
+            self.mana_restoring_heroes.clear()
+            self.save_state()
+            return
+        for hero_id in list(self.healing_heroes):
+            self.scheduler.schedule(('health', hero_id), 0, self._heal_hero_tick)
+        for hero_id in list(self.mana_restoring_heroes):
+            self.scheduler.schedule(('mana', hero_id), 0, self._restore_mana_tick)
+
+    def record_session(self, op, resource, hero_id, at=None):
+        """Journal a session start/stop, compacting the journal when it grows large"""
+        try:
+            if self.journal.record(op, resource, hero_id, at):
+                self.save_state()
+        except Exception as e:
+            logger.warning("⚠️  Could not journal healing state: %s", e)
 
     def save_state(self):
-        """Save healing state to file"""
+        """Write a compacted snapshot of all sessions"""
         try:
-            # Convert to serializable format
-            data = {}
-            for hero_id, info in self.healing_heroes.items():
-                data[hero_id] = {
-                    'last_heal': info.get('last_heal', datetime.now().isoformat()).isoformat(),
-                    'active': True
-                }
-
-            with open(self.state_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            self.journal.compact({
+                'health': {hero_id: info['last_heal']
+                           for hero_id, info in list(self.healing_heroes.items())},
+                'mana': {hero_id: info['last_restore']
+                         for hero_id, info in list(self.mana_restoring_heroes.items())},
+            })
         except Exception as e:
-            print(f"⚠️  Could not save healing state: {e}")
+            logger.warning("⚠️  Could not save healing state: %s", e)
 
     def start_hero_healing(self, hero_id):
         """Start healing process for a hero"""
+        if not self.per_hero_sessions():
+            # Health is regenerated lazily or by set-based ticks; a session
+            # would double count it. The loop only needs to look at the hero.
+            self.mark_heroes_dirty([hero_id])
+            return False
         try:
-            hero = Hero.objects.get(id=hero_id)
+            hero = self.write_buffer.get(hero_id)
 
             if hero.current_health >= hero.max_health:
-                print(f"✅ {hero.name} is already at full health")
+                event_logger.debug("✅ %s is already at full health", hero.name)
                 return False
 
             if hero_id in self.healing_heroes:
-                print(f"🔄 {hero.name} is already being healed")
+                event_logger.debug("🔄 %s is already being healed", hero.name)
                 return True
 
-            # Start healing thread for this hero
-            heal_thread = threading.Thread(
-                target=self._heal_hero_loop,
-                args=(hero_id,),
-                daemon=True
-            )
-
+            started_at = clock.now()
             self.healing_heroes[hero_id] = {
-                'last_heal': datetime.now(),
-                'thread': heal_thread
+                'last_heal': started_at
             }
 
-            heal_thread.start()
-            self.save_state()
+            self.scheduler.schedule(
+                ('health', hero_id), 0, self._heal_hero_tick)
+            self.record_session('start', 'health', hero_id, started_at)
 
-            print(f"🚀 Started healing {hero.name} (ID: {hero_id})")
-            print(f"Healing rate {hero.health_regeneration_rate} HP/sec")
+            self.summary.add('health_started')
+            event_logger.debug("🚀 Started healing %s (ID: %s) at %s HP/sec",
+                               hero.name, hero_id, hero.health_regen_rate)
             return True
 
         except Hero.DoesNotExist:
-            print(f"❌ Hero with ID {hero_id} not found")
+            logger.warning("❌ Hero with ID %s not found", hero_id)
             return False
 
     def stop_hero_healing(self, hero_id):
         """Stop healing process for a hero"""
         if hero_id in self.healing_heroes:
             del self.healing_heroes[hero_id]
-            self.save_state()
-            print(f"⏹️  Stopped healing for hero {hero_id}")
+            self.scheduler.cancel(('health', hero_id))
+            self.record_session('stop', 'health', hero_id)
+            event_logger.debug("⏹️  Stopped healing for hero %s", hero_id)
             return True
         return False
 
-    def _heal_hero_loop(self, hero_id):
-        """Main healing loop for a specific hero"""
-        while hero_id in self.healing_heroes and self.running:
-            try:
-                hero = Hero.objects.get(id=hero_id)
-
-                # Check if hero needs healing
-                if hero.current_health >= hero.max_health:
-                    print(f"✅ {hero.name} is fully healed! Stopping healing.")
-                    self.stop_hero_healing(hero_id)
-                    break
+    def _heal_hero_tick(self, key):
+        """
+        Single healing tick for a hero, run by the scheduler thread.
+        Returns the delay until the next tick, or None when healing is done.
+        """
+        _, hero_id = key
+        if hero_id not in self.healing_heroes or not self.running:
+            return None
+        try:
+            hero = self.write_buffer.get(hero_id)
 
-                # Heal the hero
-                old_health = hero.current_health
-                hero.current_health = min(
-                    hero.current_health + hero.health_regeneration_rate, hero.max_health)
-                hero.save()
+            # Check if hero needs healing
+            if hero.current_health >= hero.max_health:
+                self.summary.add('health_full')
+                event_logger.debug("✅ %s is fully healed! Stopping healing.", hero.name)
+                self.stop_hero_healing(hero_id)
+                return None
 
-                # Update last heal time
-                self.healing_heroes[hero_id]['last_heal'] = datetime.now()
+            # Heal the hero
+            old_health = hero.current_health
+            hero.current_health = min(
+                hero.current_health + hero.health_regen_rate, hero.max_health)
+            self.write_buffer.add(hero_id, current_health=hero.current_health - old_health)
+            self.metrics.record_rows(1)
 
-                print(
-                    f"❤️  Healed {hero.name}: {old_health} → {hero.current_health}/{hero.max_health} HP")
+            # Update last heal time
+            self.healing_heroes[hero_id]['last_heal'] = clock.now()
 
-                # Wait for next heal
-                time.sleep(self.heal_interval)
+            self.summary.add('healed')
+            event_logger.debug("❤️  Healed %s: %s → %s/%s HP", hero.name,
+                               old_health, hero.current_health, hero.max_health)
 
-            except Hero.DoesNotExist:
-                print(f"❌ Hero {hero_id} no longer exists. Stopping healing.")
-                self.stop_hero_healing(hero_id)
-                break
-            except Exception as e:
-                print(f"⚠️  Error healing hero {hero_id}: {e}")
-                time.sleep(5)  # Wait a bit before retrying
+            # Wait for next heal
+            return self.heal_interval
 
-    def _restore_mana_loop(self, hero_id):
-        """Main mana restoration loop for a specific hero"""
-        while hero_id in self.mana_restoring_heroes and self.running:
-            try:
-                hero = Hero.objects.get(id=hero_id)
+        except Hero.DoesNotExist:
+            logger.warning("❌ Hero %s no longer exists. Stopping healing.", hero_id)
+            self.stop_hero_healing(hero_id)
+            return None
+        except Exception as e:
+            logger.warning("⚠️  Error healing hero %s: %s", hero_id, e)
+            return self.retry_interval  # Wait a bit before retrying
+
+    def _restore_mana_tick(self, key):
+        """
+        Single mana restoration tick for a hero, run by the scheduler thread.
+        Returns the delay until the next tick, or None when restoration is done.
+        """
+        _, hero_id = key
+        if hero_id not in self.mana_restoring_heroes or not self.running:
+            return None
+        try:
+            hero = self.write_buffer.get(hero_id)
 
-                # Check if hero needs mana restoration
-                if hero.current_mana >= hero.max_mana:
-                    print(
-                        f"✅ {hero.name} is fully restored! Stopping mana restoration.")
-                    self.stop_mana_restoration(hero_id)
-                    break
+            # Check if hero needs mana restoration
+            if hero.current_mana >= hero.max_mana:
+                self.summary.add('mana_full')
+                event_logger.debug("✅ %s is fully restored! Stopping mana restoration.", hero.name)
+                self.stop_mana_restoration(hero_id)
+                return None
 
-                # Restore mana
-                old_mana = hero.current_mana
-                hero.current_mana = min(
-                    hero.current_mana + hero.mana_regeneration_rate, hero.max_mana)
-                hero.save()
+            # Restore mana
+            old_mana = hero.current_mana
+            hero.current_mana = min(
+                hero.current_mana + hero.mana_regen_rate, hero.max_mana)
+            self.write_buffer.add(hero_id, current_mana=hero.current_mana - old_mana)
+            self.metrics.record_rows(1)
 
-                # Update last restore time
-                self.mana_restoring_heroes[hero_id]['last_restore'] = datetime.now(
-                )
+            # Update last restore time
+            self.mana_restoring_heroes[hero_id]['last_restore'] = clock.now()
 
-                print(
-                    f"🔮 Restored {hero.name}: {old_mana} → {hero.current_mana}/{hero.max_mana} MP")
+            self.summary.add('mana_restored')
+            event_logger.debug("🔮 Restored %s: %s → %s/%s MP", hero.name,
+                               old_mana, hero.current_mana, hero.max_mana)
 
-                # Wait for next restore
-                time.sleep(self.mana_restore_interval)
+            # Wait for next restore
+            return self.mana_restore_interval
 
-            except Hero.DoesNotExist:
-                print(
-                    f"❌ Hero {hero_id} no longer exists. Stopping mana restoration.")
-                self.stop_mana_restoration(hero_id)
-                break
-            except Exception as e:
-                print(f"⚠️  Error restoring mana for hero {hero_id}: {e}")
-                time.sleep(5)  # Wait a bit before retrying
+        except Hero.DoesNotExist:
+            logger.warning("❌ Hero %s no longer exists. Stopping mana restoration.", hero_id)
+            self.stop_mana_restoration(hero_id)
+            return None
+        except Exception as e:
+            logger.warning("⚠️  Error restoring mana for hero %s: %s", hero_id, e)
+            return self.retry_interval  # Wait a bit before retrying
 
     def stop_mana_restoration(self, hero_id):
         """Stop mana restoration process for a hero"""
         if hero_id in self.mana_restoring_heroes:
             del self.mana_restoring_heroes[hero_id]
-            self.save_state()
-            print(f"⏹️  Stopped mana restoration for hero {hero_id}")
+            self.scheduler.cancel(('mana', hero_id))
+            self.record_session('stop', 'mana', hero_id)
+            event_logger.debug("⏹️  Stopped mana restoration for hero %s", hero_id)
             return True
         return False
 
     def start_restoring_mana(self, hero_id):
         """Start mana restoration process for a hero"""
+        if not self.per_hero_sessions():
+            # Mana is regenerated lazily or by set-based ticks; a session
+            # would double count it. The loop only needs to look at the hero.
+            self.mark_heroes_dirty([hero_id])
+            return False
         try:
-            hero = Hero.objects.get(id=hero_id)
+            hero = self.write_buffer.get(hero_id)
 
             if hero.current_mana >= hero.max_mana:
-                print(f"✅ {hero.name} is already at full mana")
+                event_logger.debug("✅ %s is already at full mana", hero.name)
                 return False
 
             if hero_id in self.mana_restoring_heroes:
-                print(f"🔄 {hero.name} is already restoring mana")
+                event_logger.debug("🔄 %s is already restoring mana", hero.name)
                 return True
 
-            # Start mana restoration thread for this hero
-            restore_thread = threading.Thread(
-                target=self._restore_mana_loop,
-                args=(hero_id,),
-                daemon=True
-            )
-
+            started_at = clock.now()
             self.mana_restoring_heroes[hero_id] = {
-                'last_restore': datetime.now(),
-                'thread': restore_thread
+                'last_restore': started_at
             }
 
-            restore_thread.start()
-            self.save_state()
+            self.scheduler.schedule(
+                ('mana', hero_id), 0, self._restore_mana_tick)
+            self.record_session('start', 'mana', hero_id, started_at)
 
-            print(f"🚀 Started restoring mana for {hero.name} (ID: {hero_id})")
-            print(f"Restoration rate {hero.mana_regeneration_rate} MP/sec")
+            self.summary.add('mana_started')
+            event_logger.debug("🚀 Started restoring mana for %s (ID: %s) at %s MP/sec",
+                               hero.name, hero_id, hero.mana_regen_rate)
             return True
 
         except Hero.DoesNotExist:
-            print(f"❌ Hero with ID {hero_id} not found")
+            logger.warning("❌ Hero with ID %s not found", hero_id)
             return False
 
+    def change_health(self, hero, delta):
+        """Add delta (clamped to 0..max) to the health of a hero loaded from the write buffer"""
+        if lazy_regen_enabled():
+            # The loaded health includes regeneration the stored column does
+            # not: a buffered delta would be applied to the stale column and
+            # drop that regeneration. Apply it on top of a regenerated copy.
+            hero.apply_vitals_delta(health=delta)
+            return
+        old_health = hero.current_health
+        hero.current_health = max(0, min(hero.current_health + delta, hero.max_health))
+        self.write_buffer.add(hero.pk, current_health=hero.current_health - old_health)
+
     def rest_hero(self, hero_id):
         """Instantly heal hero to full health"""
         try:
-            hero = Hero.objects.get(id=hero_id)
+            hero = self.write_buffer.get(hero_id)
 
             if hero.current_health >= hero.max_health:
-                print(f"✅ {hero.name} is already at full health")
+                logger.info("✅ %s is already at full health", hero.name)
                 return False
 
             old_health = hero.current_health
-            hero.current_health = hero.max_health
-            hero.save()
+            self.change_health(hero, hero.max_health - old_health)
 
             # Stop ongoing healing since hero is now full
             self.stop_hero_healing(hero_id)
 
-            print(
-                f"💤 {hero.name} rested: {old_health} → {hero.current_health}/{hero.max_health} HP")
+            logger.info("💤 %s rested: %s → %s/%s HP", hero.name,
+                        old_health, hero.current_health, hero.max_health)
             return True
 
         except Hero.DoesNotExist:
-            print(f"❌ Hero with ID {hero_id} not found")
+            logger.warning("❌ Hero with ID %s not found", hero_id)
             return False
 
     def damage_hero(self, hero_id, damage):
         """Damage a hero and start healing"""
         try:
-            hero = Hero.objects.get(id=hero_id)
+            hero = self.write_buffer.get(hero_id)
             old_health = hero.current_health
-            hero.current_health = max(0, hero.current_health - damage)
-            hero.save()
+            self.change_health(hero, -damage)
 
-            print(
-                f"⚔️  Damaged {hero.name}: {old_health} → {hero.current_health}/{hero.max_health} HP")
+            logger.info("⚔️  Damaged %s: %s → %s/%s HP", hero.name,
+                        old_health, hero.current_health, hero.max_health)
 
             # Start healing if hero is alive and not at full health
             if hero.current_health > 0 and hero.current_health < hero.max_health:
@@ -275,34 +376,68 @@ class HealingDaemon:
             return True
 
         except Hero.DoesNotExist:
-            print(f"❌ Hero with ID {hero_id} not found")
+            logger.warning("❌ Hero with ID %s not found", hero_id)
             return False
 
+    def handle_command(self, command):
+        """Run one command received over the command channel"""
+        name = command.get('command')
+        hero_id = command.get('hero_id')
+        if name == 'start_healing':
+            return self.start_hero_healing(hero_id)
+        if name == 'stop_healing':
+            return self.stop_hero_healing(hero_id)
+        if name == 'start_mana':
+            return self.start_restoring_mana(hero_id)
+        if name == 'stop_mana':
+            return self.stop_mana_restoration(hero_id)
+        if name == 'rest':
+            return self.rest_hero(hero_id)
+        if name == 'damage':
+            return self.damage_hero(hero_id, command['damage'])
+        if name == 'dirty':
+            return self.mark_heroes_dirty(command['hero_ids'])
+        raise ValueError(f"Unknown command: {name}")
+
+    def start_services(self, mode):
+        """Start the command channel and status publishing for a long-running mode"""
+        self.mode = mode
+        # Hero.heal()/take_damage() in this process go through the buffer too
+        Hero.vitals_write_buffer = self.write_buffer
+        self.resume_sessions()
+        self.serve_commands()
+        if self.status_publisher is None:
+            self.status_publisher = StatusPublisher(
+                self.status_file, self.status_snapshot)
+            self.status_publisher.start()
+
+    def serve_commands(self):
+        """Start accepting commands from web workers"""
+        if self.command_server is None:
+            self.command_server = CommandServer(
+                self.command_address, self.handle_command, spool_file=self.spool_file)
+            self.command_server.start()
+            logger.info("📡 Listening for commands on %s", self.command_address)
+
+    def status_snapshot(self):
+        """Current daemon state and metrics, as published to the status file"""
+        return {
+            'status': 'running' if self.running else 'stopped',
+            'mode': self.mode,
+            'active_sessions': {
+                'health': len(self.healing_heroes),
+                'mana': len(self.mana_restoring_heroes),
+            },
+            # list() copies the keys atomically while ticks modify the dicts
+            'healing_heroes': sorted(list(self.healing_heroes)),
+            'mana_restoring_heroes': sorted(list(self.mana_restoring_heroes)),
+            'metrics': self.metrics.snapshot(),
+            'write_buffer': self.write_buffer.snapshot(),
+        }
+
     def status(self):
         """Show current healing status"""
-        print(f"\n📊 Healing Daemon Status - {datetime.now()}")
-        print(f"🔄 Active healing sessions: {len(self.healing_heroes)}")
-
-        if not self.healing_heroes:
-            print("😴 No heroes currently being healed")
-            return
-
-        for hero_id, info in self.healing_heroes.items():
-            try:
-                hero = Hero.objects.get(id=hero_id)
-                last_heal = info.get('last_heal', 'Unknown')
-                print(
-                    f"   🏥 {hero.name}: {hero.current_health}/{hero.max_health} HP (Last heal: {last_heal})")
-            except Hero.DoesNotExist:
-                print(f"   ❌ Hero {hero_id}: Not found")
-        for hero_id, info in self.mana_restoring_heroes.items():
-            try:
-                hero = Hero.objects.get(id=hero_id)
-                last_restore = info.get('last_restore', 'Unknown')
-                print(
-                    f"   🔮 {hero.name}: {hero.current_mana}/{hero.max_mana} MP (Last restore: {last_restore})")
-            except Hero.DoesNotExist:
-                print(f"   ❌ Hero {hero_id}: Not found")
+        print_status(self.status_snapshot())
 
     def run_interactive(self):
         """Run daemon in interactive mode for testing"""
@@ -316,6 +451,7 @@ class HealingDaemon:
         print("  heroes             - List all heroes")
         print("  quit               - Exit daemon")
         print()
+        self.start_services('interactive')
 
         while self.running:
             try:
@@ -359,55 +495,342 @@ class HealingDaemon:
 
         self.shutdown()
 
-    def run_passive_mode(self):
+    def run_passive_mode(self, bulk=False, vectorized=False):
         # for every hero not in combat and not at full health, start healing
-        print("\n🎮 Passive Healing Daemon Mode")
-        while self.running:
+        if lazy_regen_enabled():
+            # Readers interpolate vitals: only completions need to be stored
+            return self.run_time_to_full_mode()
+        if bulk:
+            return self.run_bulk_mode()
+        if vectorized:
+            return self.run_vectorized_mode()
+        logger.info("🎮 Passive Healing Daemon Mode")
+        self.start_services('passive')
+        try:
+            # Full scan once, then only look at heroes reported dirty
             self.restore_health()
             self.restore_mana()
+            while self.running:
+                if clock.wait(self.wakeup, self.sweep_interval):
+                    hero_ids = self.take_dirty_heroes()
+                    if hero_ids:
+                        self.restore_health(hero_ids)
+                        self.restore_mana(hero_ids)
+                else:
+                    # Safety sweep for changes that sent no notification
+                    self.restore_health()
+                    self.restore_mana()
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+
+    def run_time_to_full_mode(self):
+        """
+        With HERO_LAZY_REGEN readers interpolate HP/MP, so the daemon writes no
+        intermediate values. It schedules one event per regenerating hero at the
+        time it will be full (or a checkpoint for long regens) and only then
+        stores its vitals. Writes scale with damage events, not elapsed seconds.
+        """
+        logger.info("🎮 Time-to-full Healing Daemon Mode")
+        self.start_services('time-to-full')
+        try:
+            self.schedule_completions()
+            while self.running:
+                if clock.wait(self.wakeup, self.sweep_interval):
+                    hero_ids = self.take_dirty_heroes()
+                    if hero_ids:
+                        self.schedule_completions(hero_ids)
+                else:
+                    # Safety sweep for changes that sent no notification
+                    self.schedule_completions()
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+
+    def completion_delay(self, full_at):
+        """Seconds until the next stored checkpoint for a hero full at full_at"""
+        remaining = (full_at - clock.now()).total_seconds()
+        return min(max(0, remaining), self.checkpoint_interval)
 
-    def restore_health(self):
-        """Restore health for all heroes not in combat"""
+    def schedule_completions(self, hero_ids=None):
+        """Schedule the completion event of every regenerating hero (or the given ones)"""
         try:
-            heroes = Hero.objects.filter(
-                is_in_combat=False, current_health__lt=F('max_health'))
+            heroes = Hero.objects.needing_regeneration()
+            if hero_ids is not None:
+                heroes = heroes.filter(id__in=hero_ids)
             for hero in heroes:
-                if hero.id not in self.healing_heroes:
-                    self.start_hero_healing(hero.id)
-            time.sleep(self.heal_interval)  # Check every 30 seconds
+                self.scheduler.schedule(
+                    ('full', hero.id), self.completion_delay(hero.vitals_full_at()),
+                    self._complete_regen_tick)
+        except Exception as e:
+            logger.warning("⚠️  Error scheduling regen completions: %s", e)
+
+    def _complete_regen_tick(self, key):
+        """
+        Store a hero's interpolated vitals, run by the scheduler thread.
+        Returns the delay until the next checkpoint, or None once the hero is full.
+        """
+        _, hero_id = key
+        if not self.running:
+            return None
+        try:
+            # Loading applies lazy regeneration up to now
+            hero = Hero.objects.get(id=hero_id)
+            if hero.is_in_combat:
+                return None
+            # Only store if nobody wrote the hero since it was loaded
+            written = Hero.objects.filter(
+                id=hero_id, version=hero.version,
+            ).update(current_health=hero.current_health, current_mana=hero.current_mana,
+                     last_vitals_at=hero._vitals_as_of, version=F('version') + 1)
+            if not written:
+                return 0  # changed concurrently: reload and recompute
+            self.metrics.record_rows(written)
+            full_at = hero.vitals_full_at()
+            if full_at <= hero._vitals_as_of:
+                self.summary.add('regen_completed')
+                event_logger.debug("✅ %s is fully regenerated", hero.name)
+                return None
+            return self.completion_delay(full_at)
+
+        except Hero.DoesNotExist:
+            return None
         except Exception as e:
-            print(f"Error in passive mode: {e}")
+            logger.warning("⚠️  Error completing regen for hero %s: %s", hero_id, e)
+            return self.retry_interval
+
+    def run_bulk_mode(self):
+        """
+        Regenerate every eligible hero with set-based UPDATE statements.
+        Tick cost depends on the number of statements, not on the number of heroes.
+        """
+        logger.info("🎮 Bulk Healing Daemon Mode")
+        self.start_services('bulk')
+        next_heal = next_restore = clock.monotonic()
+        healed = restored = None
+        try:
+            while self.running:
+                now = clock.monotonic()
+                if now >= next_heal:
+                    with self.metrics.tick(lag=now - next_heal):
+                        healed = self.bulk_restore_health()
+                    next_heal = now + self.heal_interval
+                if now >= next_restore:
+                    with self.metrics.tick(lag=now - next_restore):
+                        restored = self.bulk_restore_mana()
+                    next_restore = now + self.mana_restore_interval
+                if healed == 0 and restored == 0:
+                    # Everyone is full: sleep until a hero is reported dirty
+                    clock.wait(self.wakeup, self.sweep_interval)
+                    self.take_dirty_heroes()
+                    next_heal = next_restore = clock.monotonic()
+                    healed = restored = None
+                    continue
+                clock.wait(self.wakeup, max(0, min(next_heal, next_restore) - clock.monotonic()))
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
 
-    def restore_mana(self):
-        """Restore mana for all heroes not in combat"""
+    def run_vectorized_mode(self):
+        """
+        Regenerate from an in-memory NumPy vitals table, refreshed from the
+        heroes reported dirty. A tick is one vectorized add-and-clip and only
+        the rows it changed are written back.
+        """
+        from hero.daemon.vitals import VitalsTable
+
+        logger.info("🎮 Vectorized Healing Daemon Mode")
+        self.start_services('vectorized')
+        table = VitalsTable()
+        logger.info("📦 Loaded vitals for %d heroes", table.load())
+        next_heal = next_restore = clock.monotonic()
+        next_sweep = next_heal + self.sweep_interval
         try:
-            heroes = Hero.objects.filter(
-                is_in_combat=False, current_mana__lt=F('max_mana'))
-            for hero in heroes:
-                if hero.id not in self.mana_restoring_heroes:
-                    self.start_restoring_mana(hero.id)
-            time.sleep(self.mana_restore_interval)  # Check every 60 seconds
+            while self.running:
+                hero_ids = self.take_dirty_heroes()
+                if hero_ids:
+                    table.refresh(hero_ids)
+                now = clock.monotonic()
+                if now >= next_sweep:
+                    # Safety reload for changes that sent no notification
+                    table.load()
+                    next_sweep = now + self.sweep_interval
+                if now >= next_heal:
+                    with self.metrics.tick(lag=now - next_heal):
+                        healed = table.tick('health')
+                    self.metrics.record_rows(healed)
+                    if healed:
+                        logger.info("❤️  Vectorized healed %d heroes", healed)
+                    next_heal = now + self.heal_interval
+                if now >= next_restore:
+                    with self.metrics.tick(lag=now - next_restore):
+                        restored = table.tick('mana')
+                    self.metrics.record_rows(restored)
+                    if restored:
+                        logger.info("🔮 Vectorized restored mana for %d heroes", restored)
+                    next_restore = now + self.mana_restore_interval
+                if not table.needs_regeneration():
+                    # Everyone is full: sleep until a hero is reported dirty
+                    clock.wait(self.wakeup, max(0, next_sweep - clock.monotonic()))
+                    next_heal = next_restore = clock.monotonic()
+                    continue
+                clock.wait(self.wakeup, max(0, min(next_heal, next_restore) - clock.monotonic()))
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+
+    def bulk_restore_health(self):
+        """Apply one health tick to all heroes not in combat in a single statement"""
+        try:
+            healed = Hero.objects.regenerate_health()
+            self.metrics.record_rows(healed)
+            if healed:
+                logger.info("❤️  Bulk healed %d heroes", healed)
+            return healed
+        except Exception as e:
+            logger.warning("⚠️  Error in bulk healing: %s", e)
+            return 0
+
+    def bulk_restore_mana(self):
+        """Apply one mana tick to all heroes not in combat in a single statement"""
+        try:
+            restored = Hero.objects.regenerate_mana()
+            self.metrics.record_rows(restored)
+            if restored:
+                logger.info("🔮 Bulk restored mana for %d heroes", restored)
+            return restored
         except Exception as e:
-            print(f"⚠️  Error restoring mana: {e}")
+            logger.warning("⚠️  Error in bulk mana restoration: %s", e)
+            return 0
+
+    def mark_heroes_dirty(self, hero_ids):
+        """Record heroes that may need regeneration and wake the passive loop"""
+        with self.dirty_lock:
+            self.dirty_heroes.update(hero_ids)
+        self.wakeup.set()
+        return len(hero_ids)
+
+    def take_dirty_heroes(self):
+        """Return and clear the heroes reported dirty since the last call"""
+        with self.dirty_lock:
+            self.wakeup.clear()
+            hero_ids, self.dirty_heroes = self.dirty_heroes, set()
+        return hero_ids
+
+    def restore_health(self, hero_ids=None):
+        """Restore health for heroes not in combat (all of them, or the given ones)"""
+        try:
+            heroes = Hero.objects.needing_health()
+            if hero_ids is not None:
+                heroes = heroes.filter(id__in=hero_ids)
+            for hero_id in heroes.values_list('id', flat=True):
+                if hero_id not in self.healing_heroes:
+                    self.start_hero_healing(hero_id)
+        except Exception as e:
+            logger.warning("⚠️  Error in passive mode: %s", e)
+
+    def restore_mana(self, hero_ids=None):
+        """Restore mana for heroes not in combat (all of them, or the given ones)"""
+        try:
+            heroes = Hero.objects.needing_mana()
+            if hero_ids is not None:
+                heroes = heroes.filter(id__in=hero_ids)
+            for hero_id in heroes.values_list('id', flat=True):
+                if hero_id not in self.mana_restoring_heroes:
+                    self.start_restoring_mana(hero_id)
+        except Exception as e:
+            logger.warning("⚠️  Error restoring mana: %s", e)
 
     def shutdown(self):
         """Gracefully shutdown the daemon"""
-        print("\n🛑 Shutting down healing daemon...")
+        logger.info("🛑 Shutting down healing daemon...")
         self.running = False
+        self.wakeup.set()
+        # Stop ticking first so no-op ticks are not counted while services stop
+        self.scheduler.stop()
+        if self.command_server:
+            self.command_server.stop()
+        if self.status_publisher:
+            self.status_publisher.stop()
+        if Hero.vitals_write_buffer is self.write_buffer:
+            Hero.vitals_write_buffer = None
+        try:
+            self.write_buffer.stop()
+        except Exception as e:
+            logger.warning("⚠️  Could not flush buffered vitals: %s", e)
         self.save_state()
-        print("💾 State saved")
-        print("👋 Goodbye!")
+        self.journal.close()
+        self.summary.flush()
+        windows_tasks.DAEMON_NOTIFICATIONS = self._notifications
+        logger.info("💾 State saved")
+        logger.info("👋 Goodbye!")
+
+
+def print_status(snapshot):
+    """Print a daemon status snapshot"""
+    print(f"\n📊 Healing Daemon Status - {snapshot.get('updated_at', datetime.now())}")
+    print(f"🩺 Daemon: {snapshot.get('status', 'unknown')} ({snapshot.get('mode', 'unknown')} mode)")
+    sessions = snapshot.get('active_sessions', {})
+    print(f"🔄 Active healing sessions: {sessions.get('health', 0)}")
+    print(f"🔮 Active mana sessions: {sessions.get('mana', 0)}")
+
+    metrics = snapshot.get('metrics')
+    if not metrics:
+        return
+    duration = metrics['tick_duration_ms']
+    lag = metrics['tick_lag_ms']
+    statements = metrics['statements_per_tick']
+    print(f"⏱️  Ticks: {metrics['ticks']} "
+          f"(duration p50 {duration['p50']}ms / p99 {duration['p99']}ms / max {duration['max']}ms)")
+    print(f"🐢 Tick lag: p50 {lag['p50']}ms / p99 {lag['p99']}ms / max {lag['max']}ms")
+    print(f"🗄️  DB statements per tick: avg {statements['avg']} / max {statements['max']}")
+    print(f"✍️  Rows updated: {metrics['rows_updated']} ({metrics['rows_per_second']}/sec)")
+    buffer = snapshot.get('write_buffer')
+    if buffer:
+        print(f"🧺 Write buffer: {buffer['pending']} pending, "
+              f"{buffer['rows_flushed']} rows in {buffer['flushes']} flushes")
+
+
+def option(name, default):
+    """Read an integer '--name value' option from the command line"""
+    if name in sys.argv[:-1]:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1].lower() == 'status':
+        # Read the published snapshot; never touches the Hero table
+        print_status(get_daemon_status())
+        sys.exit(0)
+
+    configure_logging(settings.HEALING_DAEMON_LOG_LEVEL, settings.HEALING_DAEMON_LOG_EVENTS)
+
+    if len(sys.argv) > 1 and sys.argv[1].lower() == 'worker':
+        from hero.daemon.partitioned import run_worker, run_workers
+        partitions = option('--partitions', 16)
+        processes = option('--processes', 1)
+        if processes > 1:
+            run_workers(partitions, processes)
+        else:
+            run_worker(partitions)
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1].lower() == 'async':
+        import asyncio
+        from hero.daemon.async_daemon import AsyncHealingDaemon
+        try:
+            asyncio.run(AsyncHealingDaemon().run_passive_mode())
+        except KeyboardInterrupt:
+            print("👋 Goodbye!")
+        sys.exit(0)
+
     daemon = HealingDaemon()
 
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
 
-        if command == 'status':
-            daemon.status()
-        elif command == 'heal' and len(sys.argv) > 2:
+        if command == 'heal' and len(sys.argv) > 2:
             hero_id = int(sys.argv[2])
             daemon.start_hero_healing(hero_id)
             daemon.run_interactive()
@@ -415,14 +838,17 @@ if __name__ == '__main__':
             hero_id = int(sys.argv[2])
             damage = int(sys.argv[3])
             daemon.damage_hero(hero_id, damage)
+            daemon.write_buffer.flush()
         elif command == 'rest' and len(sys.argv) > 2:
             hero_id = int(sys.argv[2])
             daemon.rest_hero(hero_id)
+            daemon.write_buffer.flush()
         elif command == 'passive':
-            daemon.run_passive_mode()
+            daemon.run_passive_mode(bulk='--bulk' in sys.argv[2:],
+                                    vectorized='--vectorized' in sys.argv[2:])
         else:
             print(
-                "Usage: python healing_daemon.py [status|heal <id>|damage <id> <amount>|rest <id>]")
+                "Usage: python healing_daemon.py [status|heal <id>|damage <id> <amount>|rest <id>|passive [--bulk|--vectorized]|async|worker [--partitions N] [--processes N]]")
     else:
         # Run in interactive mode
         daemon.run_interactive()
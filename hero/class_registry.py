@@ -0,0 +1,99 @@
+"""
+Process-wide cache of the HeroClass table.
+HeroClass is tiny and nearly static, so the whole table is kept in memory and
+looked up by id or name without a query. Saves and deletes in this process
+invalidate it at once (see hero.signals); other processes notice a change
+through a version stamp of the table (row count and latest updated_at),
+checked at most every check_interval seconds, and reload at once on a
+lookup miss. Load it before gunicorn forks its workers (--preload, see
+game/wsgi.py) so they share one copy.
+The cached instances are shared: treat them as read-only.
+"""
+import threading
+
+from django.db import DatabaseError, connections
+from django.db.models import Count, Max
+
+from hero import clock
+from hero.models import HeroClass
+
+
+class HeroClassRegistry:
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self._by_id = None  # {id: HeroClass}, None until loaded
+        self._by_name = {}
+        self._stamp = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _db_stamp(self):
+        stamp = HeroClass.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        return stamp['count'], stamp['updated_at']
+
+    def load(self):
+        """(Re)load every class from the database"""
+        with self._lock:
+            stamp = self._db_stamp()
+            classes = list(HeroClass.objects.order_by('id'))
+            by_name = {}
+            for hero_class in classes:
+                by_name.setdefault(hero_class.name, hero_class)
+            self._by_id = {hero_class.id: hero_class for hero_class in classes}
+            self._by_name = by_name
+            self._stamp = stamp
+            self._checked_at = clock.monotonic()
+
+    def preload(self):
+        """Load before forking; if the table is not there yet, load on first use instead"""
+        try:
+            self.load()
+        except DatabaseError:
+            pass
+        finally:
+            # Workers must not share the connection opened here
+            connections.close_all()
+
+    def invalidate(self):
+        """Reload on the next lookup"""
+        self._by_id = None
+
+    def _classes(self):
+        if self._by_id is None:
+            self.load()
+        elif clock.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = clock.monotonic()
+            if self._db_stamp() != self._stamp:
+                self.load()
+        return self._by_id
+
+    def _find(self, pk=None, name=None):
+        classes = self._classes()
+        hero_class = self._by_name.get(name) if pk is None else classes.get(pk)
+        if hero_class is None:
+            # Possibly created by another process since the last check: the
+            # table is tiny, so reload once instead of waiting for the stamp
+            self.load()
+            hero_class = self._by_name.get(name) if pk is None else self._by_id.get(pk)
+        return hero_class
+
+    def get(self, pk=None, *, name=None):
+        """The class with the given id or name; raises HeroClass.DoesNotExist"""
+        hero_class = self._find(pk, name)
+        if hero_class is None:
+            raise HeroClass.DoesNotExist(
+                f"HeroClass {name if pk is None else pk} does not exist")
+        return hero_class
+
+    def first(self, *, name=None):
+        """The first class (with the given name), or None"""
+        if name is not None:
+            return self._find(name=name)
+        return next(iter(self._classes().values()), None)
+
+    def all(self):
+        """Every class, in id order"""
+        return list(self._classes().values())
+
+
+hero_classes = HeroClassRegistry()
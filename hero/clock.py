@@ -0,0 +1,131 @@
+"""
+Pluggable clock for the healing daemon, regeneration and timed effects.
+Code asks this module for the time instead of calling timezone.now(),
+time.monotonic() or time.sleep() directly, so the real clock can be swapped
+for a SimulatedClock that fast-forwards: benchmarks and soak tests replay
+hours of game time in seconds.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+class SystemClock:
+    """The real clock"""
+
+    def now(self):
+        return timezone.now()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, waitable, timeout=None):
+        """waitable.wait(timeout) for an Event or a (held) Condition"""
+        return waitable.wait(timeout)
+
+
+class SimulatedClock:
+    """
+    A clock whose time only moves when advanced. Sleeping and waiting never
+    block for the simulated duration: once every thread that uses the clock
+    is waiting (checked every `step` real seconds), time jumps to the earliest
+    of their deadlines. A thread busy with work holds time back, as a real
+    clock would appear to a program running infinitely fast.
+    """
+
+    def __init__(self, start=None, step=0.001):
+        self.start = start or timezone.now()
+        self.step = step
+        self._elapsed = 0.0
+        self._participants = set()  # threads that have waited on this clock
+        self._waiting = {}  # {thread: simulated deadline or None}
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self.start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self):
+        return self._elapsed
+
+    def advance(self, seconds):
+        """Move time forward by the given number of seconds"""
+        with self._lock:
+            self._elapsed += seconds
+
+    def sleep(self, seconds):
+        self.wait(None, seconds)
+
+    def _idle_locked(self):
+        self._participants = {thread for thread in self._participants if thread.is_alive()}
+        return self._participants.issubset(self._waiting)
+
+    def wait(self, waitable, timeout=None):
+        me = threading.current_thread()
+        with self._lock:
+            deadline = None if timeout is None else self._elapsed + max(0, timeout)
+            self._participants.add(me)
+            self._waiting[me] = deadline
+        try:
+            while True:
+                if waitable is None:
+                    time.sleep(self.step)
+                elif waitable.wait(self.step):
+                    return True
+                with self._lock:
+                    if deadline is not None and self._elapsed >= deadline:
+                        return False
+                    deadlines = [d for d in self._waiting.values() if d is not None]
+                    if deadlines and self._idle_locked():
+                        self._elapsed = max(self._elapsed, min(deadlines))
+        finally:
+            with self._lock:
+                del self._waiting[me]
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Install a clock for the whole process; returns the previous one"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    """Run a block with the given clock installed"""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def now():
+    """Current (timezone aware) time"""
+    return _clock.now()
+
+
+def monotonic():
+    """Seconds from a monotonic clock, for measuring intervals"""
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+
+def wait(waitable, timeout=None):
+    """Wait on an Event or a held Condition for up to timeout clock seconds"""
+    return _clock.wait(waitable, timeout)
@@ -1,13 +1,14 @@
 from django.core.exceptions import ValidationError
 from django.shortcuts import redirect
 from django_unicorn.components import UnicornView
-from hero.models import Hero, HeroClass
+from hero.class_registry import hero_classes
+from hero.models import Hero
 from item.models import Inventory, Item, EquipmentSlots, Weapon, Armor, OffHand, Consumable
 
 
 class CharacterFormView(UnicornView):
     name: str = ""
-    hero_class = HeroClass.objects.first()
+    hero_class = hero_classes.first()
     selected_class: str = hero_class.name if hero_class else ""
     if hero_class:
         strength: int = hero_class.base_strength
@@ -32,7 +33,7 @@ class CharacterFormView(UnicornView):
     points_available: int = 10
 
     def select_class(self, cls: str):
-        hero_class = HeroClass.objects.filter(name=cls).first()
+        hero_class = hero_classes.first(name=cls)
         if hero_class:
             self.strength = hero_class.base_strength
             self.constitution = hero_class.base_constitution
@@ -69,11 +70,13 @@ class CharacterFormView(UnicornView):
         if not self.is_valid():
             return
         print(f"Creating character: {self.name}, Class: {self.selected_class}")
-        hero_class = HeroClass.objects.get(name=self.selected_class)
+        hero_class = hero_classes.get(name=self.selected_class)
         inventory = Inventory.objects.create()
+        user = self.request.user if self.request else None
         hero = Hero.objects.create(
             name=self.name,
             hero_class=hero_class,
+            owner=user if user is not None and user.is_authenticated else None,
             strength=self.strength,
             constitution=self.constitution,
             agility=self.agility,
@@ -0,0 +1,169 @@
+"""
+asyncio implementation of the healing daemon.
+Regen sessions are event loop timers and ticks use Django's async ORM, so one
+loop carries any number of heroes without a thread per session. Runs either
+standalone (python healing_daemon.py async) or as a background task started
+from the ASGI lifespan in game/asgi.py.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from hero import windows_tasks
+from hero.models import Hero, lazy_regen_enabled
+
+# resource -> HeroQuerySet method applying one clamped regen tick in an UPDATE
+RESOURCES = {
+    'health': 'regenerate_health',
+    'mana': 'regenerate_mana',
+}
+
+
+class AsyncHealingDaemon:
+    def __init__(self, heal_interval=1, mana_restore_interval=1, scan_interval=1,
+                 max_concurrent_ticks=100):
+        self.intervals = {
+            'health': heal_interval,
+            'mana': mana_restore_interval,
+        }
+        self.scan_interval = scan_interval
+        # {resource: {hero_id: asyncio.TimerHandle | asyncio.Task}}
+        self.sessions = {resource: {} for resource in RESOURCES}
+        self.retry_interval = 5
+        self.running = False
+        self._ticks = asyncio.Semaphore(max_concurrent_ticks)
+        # This process regenerates heroes itself: its saves must not notify
+        # the sync daemon (a socket connect attempt per save) until shutdown
+        self._notifications = windows_tasks.DAEMON_NOTIFICATIONS
+        windows_tasks.DAEMON_NOTIFICATIONS = False
+
+    @property
+    def healing_heroes(self):
+        return self.sessions['health']
+
+    @property
+    def mana_restoring_heroes(self):
+        return self.sessions['mana']
+
+    def start_hero_healing(self, hero_id):
+        """Start healing process for a hero"""
+        return self._start(hero_id, 'health')
+
+    def start_restoring_mana(self, hero_id):
+        """Start mana restoration process for a hero"""
+        return self._start(hero_id, 'mana')
+
+    def stop_hero_healing(self, hero_id):
+        """Stop healing process for a hero"""
+        return self._stop(hero_id, 'health')
+
+    def stop_mana_restoration(self, hero_id):
+        """Stop mana restoration process for a hero"""
+        return self._stop(hero_id, 'mana')
+
+    def _start(self, hero_id, resource):
+        if lazy_regen_enabled():
+            # Vitals are regenerated on read; ticking them here would double count
+            return False
+        if hero_id in self.sessions[resource]:
+            return True
+        self._schedule(hero_id, resource, 0)
+        return True
+
+    def _stop(self, hero_id, resource):
+        session = self.sessions[resource].pop(hero_id, None)
+        if session is None:
+            return False
+        session.cancel()
+        return True
+
+    def _schedule(self, hero_id, resource, delay):
+        loop = asyncio.get_running_loop()
+        self.sessions[resource][hero_id] = loop.call_later(
+            delay, self._spawn_tick, hero_id, resource)
+
+    def _spawn_tick(self, hero_id, resource):
+        if hero_id in self.sessions[resource]:
+            self.sessions[resource][hero_id] = asyncio.ensure_future(
+                self._tick(hero_id, resource))
+
+    async def _tick(self, hero_id, resource):
+        """Single regen tick for a hero; reschedules itself until full"""
+        try:
+            async with self._ticks:
+                # One conditional UPDATE adding the regen delta in SQL: changes
+                # written concurrently by web requests are never overwritten
+                heroes = Hero.objects.filter(id=hero_id)
+                regenerated = await sync_to_async(getattr(heroes, RESOURCES[resource]))()
+            if not regenerated:
+                # Full, in combat or deleted
+                self.sessions[resource].pop(hero_id, None)
+                return
+            delay = self.intervals[resource]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Error in {resource} tick for hero {hero_id}: {e}")
+            delay = self.retry_interval
+        if hero_id in self.sessions[resource] and self.running:
+            self._schedule(hero_id, resource, delay)
+
+    async def scan(self):
+        """Start sessions for every hero not in combat and missing HP/MP"""
+        async for hero_id in Hero.objects.needing_health().values_list('id', flat=True):
+            self.start_hero_healing(hero_id)
+        async for hero_id in Hero.objects.needing_mana().values_list('id', flat=True):
+            self.start_restoring_mana(hero_id)
+
+    async def run_passive_mode(self):
+        """Scan for heroes needing regeneration until stopped"""
+        if lazy_regen_enabled():
+            print("😴 HERO_LAZY_REGEN is enabled: regeneration happens on read, nothing to do")
+            return
+        print("\n🎮 Async Passive Healing Daemon Mode")
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    await self.scan()
+                except Exception as e:
+                    print(f"⚠️  Error in passive mode: {e}")
+                await asyncio.sleep(self.scan_interval)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Cancel every pending regen timer and tick"""
+        self.running = False
+        for sessions in self.sessions.values():
+            for session in sessions.values():
+                session.cancel()
+            sessions.clear()
+        windows_tasks.DAEMON_NOTIFICATIONS = self._notifications
+
+
+async def asgi_lifespan(scope, receive, send):
+    """
+    ASGI lifespan handler running the async healing daemon next to the app
+    when HEALING_DAEMON_IN_ASGI is enabled. Only use it with a single ASGI
+    worker, otherwise every worker would heal the same heroes.
+    """
+    daemon = task = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if getattr(settings, 'HEALING_DAEMON_IN_ASGI', False):
+                daemon = AsyncHealingDaemon()
+                task = asyncio.create_task(daemon.run_passive_mode())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if task:
+                daemon.running = False
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
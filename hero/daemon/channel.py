@@ -0,0 +1,239 @@
+"""
+Command channel between web workers and the healing daemon.
+Frames are a 4-byte big-endian length followed by a JSON body. A request
+frame carries a batch of commands and the reply frame carries one
+acknowledgement per command. Uses a Unix domain socket, or a loopback TCP
+socket on platforms without AF_UNIX. Commands that cannot be delivered are
+appended to a spool file which the daemon drains, so none are lost.
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from pathlib import Path
+
+HEADER = struct.Struct('>I')
+MAX_FRAME = 16 * 1024 * 1024
+HAS_UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+
+
+class ChannelError(Exception):
+    pass
+
+
+class NoReply(ChannelError):
+    """The commands were sent but not acknowledged: they may have run"""
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ChannelError('connection closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_frame(sock, payload):
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def recv_frame(sock):
+    (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if size > MAX_FRAME:
+        raise ChannelError(f'frame of {size} bytes is too large')
+    return json.loads(_recv_exactly(sock, size))
+
+
+def _connect(address, timeout):
+    if isinstance(address, (str, Path)):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = str(address)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _peer_closed(sock):
+    """Whether the other end closed an idle connection (pending EOF or reset)"""
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+    finally:
+        sock.settimeout(timeout)
+
+
+class DaemonClient:
+    """Persistent, thread-safe connection to the daemon command server"""
+
+    def __init__(self, address, timeout=2):
+        self.address = address
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def send(self, commands):
+        """
+        Send a batch of commands and return their acknowledgements. Raises
+        OSError if the batch could not be sent, and NoReply if it was sent but
+        not acknowledged; it is then never re-sent, as it may have run.
+        """
+        with self._lock:
+            if self._sock is not None and _peer_closed(self._sock):
+                self.close_locked()
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = _connect(self.address, self.timeout)
+                    send_frame(self._sock, {'commands': commands})
+                    break
+                except OSError:
+                    self.close_locked()
+                    # A reused connection may have been closed by a restarted daemon
+                    if not reused:
+                        raise
+            try:
+                return recv_frame(self._sock)['acks']
+            except (OSError, ChannelError, ValueError, KeyError) as e:
+                self.close_locked()
+                raise NoReply(f'no acknowledgement from the daemon: {e}') from e
+
+    def close_locked(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            self.close_locked()
+
+
+def spool_commands(spool_file, commands):
+    """Append undeliverable commands to the spool, one JSON line each"""
+    lines = ''.join(json.dumps(command, separators=(',', ':')) + '\n' for command in commands)
+    with open(spool_file, 'a', encoding='utf-8') as f:
+        f.write(lines)
+
+
+def drain_spool(spool_file):
+    """Take every spooled command; new commands go to a fresh spool file"""
+    spool_file = Path(spool_file)
+    if not spool_file.exists():
+        return []
+    draining = spool_file.with_name(spool_file.name + '.draining')
+    os.replace(spool_file, draining)
+    commands = []
+    with open(draining, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    commands.append(json.loads(line))
+                except ValueError:
+                    continue  # a torn line from a crashed writer
+    draining.unlink()
+    return commands
+
+
+class _CommandHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (OSError, ChannelError, ValueError):
+                return
+            acks = [self.server.dispatch(command) for command in frame.get('commands', [])]
+            try:
+                send_frame(self.request, {'acks': acks})
+            except OSError:
+                return
+
+
+class _ReusableTCPServer(socketserver.ThreadingTCPServer):
+    # Rebind at once after a restart instead of waiting out TIME_WAIT
+    allow_reuse_address = True
+
+
+class CommandServer:
+    """
+    Serves the command channel for the daemon on a background thread.
+    handler(command) is called for every command and its return value is
+    sent back in the acknowledgement.
+    """
+
+    def __init__(self, address, handler, spool_file=None, poll_interval=0.5):
+        self.address = address
+        self.handler = handler
+        self.spool_file = spool_file
+        self.poll_interval = poll_interval
+        self._server = None
+        self._thread = None
+
+    def dispatch(self, command):
+        try:
+            return {'ok': True, 'result': self.handler(command)}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    def drain(self):
+        """Run commands spooled while the daemon could not be reached"""
+        if self.spool_file:
+            for command in drain_spool(self.spool_file):
+                self.dispatch(command)
+
+    def start(self):
+        address = self.address
+        if isinstance(address, (str, Path)):
+            address = str(address)
+            if os.path.exists(address):
+                try:
+                    _connect(address, 0.5).close()
+                    raise ChannelError(f'a daemon is already listening on {address}')
+                except OSError:
+                    os.unlink(address)  # stale socket from a crashed daemon
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = _ReusableTCPServer
+        server = server_class(address, _CommandHandler)
+        server.daemon_threads = True
+        server.dispatch = self.dispatch
+        # serve_forever calls service_actions between polls: pick up the spool
+        server.service_actions = self.drain
+        self._server = server
+        self.drain()
+        self._thread = threading.Thread(
+            target=server.serve_forever, args=(self.poll_interval,),
+            name='daemon-commands', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, (str, Path)):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        self._server = None
@@ -0,0 +1,109 @@
+"""
+Crash-safe persistence of the healing daemon's regen sessions.
+Every session start/stop is appended to a journal as one JSON line, so the
+cost per event is constant. The journal is periodically compacted into a
+snapshot file written to a temporary file and atomically renamed over the
+old one. Loading replays the journal on top of the snapshot; replaying
+records already folded into the snapshot is harmless because the last
+record for a hero always wins.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+RESOURCES = ('health', 'mana')
+SNAPSHOT_VERSION = 2
+
+
+class SessionJournal:
+    def __init__(self, snapshot_file, compact_after=10000, fsync=False):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = self.snapshot_file.with_suffix('.journal')
+        # Compact once the journal holds this many records
+        self.compact_after = compact_after
+        # fsync every record to survive power loss, not just process crashes
+        self.fsync = fsync
+        self.records = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Return {resource: {hero_id: started_at}} from the snapshot and journal"""
+        sessions = {resource: {} for resource in RESOURCES}
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file) as f:
+                data = json.load(f)
+            if data.get('version') == SNAPSHOT_VERSION:
+                for resource in RESOURCES:
+                    sessions[resource] = {
+                        int(hero_id): datetime.fromisoformat(at)
+                        for hero_id, at in data.get(resource, {}).items()
+                    }
+            else:
+                # Legacy healing_state.json: {hero_id: {'last_heal': iso, 'active': True}}
+                sessions['health'] = {
+                    int(hero_id): datetime.fromisoformat(info['last_heal'])
+                    for hero_id, info in data.items() if isinstance(info, dict)
+                }
+
+        self.records = 0
+        if self.journal_file.exists():
+            with open(self.journal_file) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        resource = sessions[record['resource']]
+                    except (ValueError, KeyError):
+                        continue  # torn last line after a crash
+                    self.records += 1
+                    if record['op'] == 'start':
+                        resource[record['hero_id']] = datetime.fromisoformat(record['at'])
+                    else:
+                        resource.pop(record['hero_id'], None)
+        return sessions
+
+    def _write(self, line):
+        if self._file is None:
+            self._file = open(self.journal_file, 'a')
+        self._file.write(line)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def record(self, op, resource, hero_id, at=None):
+        """Append a session 'start' or 'stop' record"""
+        record = {'op': op, 'resource': resource, 'hero_id': hero_id}
+        if at is not None:
+            record['at'] = at.isoformat()
+        with self._lock:
+            self._write(json.dumps(record, separators=(',', ':')) + '\n')
+            self.records += 1
+            return self.records >= self.compact_after
+
+    def compact(self, sessions):
+        """Write sessions as the new snapshot and start an empty journal"""
+        data = {'version': SNAPSHOT_VERSION}
+        for resource in RESOURCES:
+            data[resource] = {
+                str(hero_id): at.isoformat() for hero_id, at in list(sessions[resource].items())
+            }
+        tmp = self.snapshot_file.with_suffix('.tmp')
+        with self._lock:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_file)
+            # Only truncate once the snapshot holding these records is in place
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_file, 'w')
+            self.records = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,118 @@
+"""
+Logging for the healing daemon hot loop.
+Daemon lifecycle and per-tick summaries go to the 'hero.daemon' logger.
+Per-hero events (every heal/restore tick) go to 'hero.daemon.events' at
+DEBUG level: off by default, or sampled. Records are handed to a bounded
+queue and written by a listener thread, so a slow terminal or journald
+never stalls a tick; when the queue is full records are dropped and counted.
+Extra structured fields are passed as extra={'fields': {...}}.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from collections import Counter
+
+from hero import clock
+
+logger = logging.getLogger('hero.daemon')
+event_logger = logging.getLogger('hero.daemon.events')
+
+FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+
+class SampleFilter(logging.Filter):
+    """Let through the given fraction of records"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends the record's structured fields as key=value pairs"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TickSummary:
+    """Counts per-hero events and logs them as one line per interval"""
+
+    def __init__(self, interval=1.0, log=logger):
+        self.interval = interval
+        self.log = log
+        self._counts = Counter()
+        self._next = clock.monotonic() + interval
+        self._lock = threading.Lock()
+
+    def add(self, event, count=1):
+        with self._lock:
+            self._counts[event] += count
+            due = clock.monotonic() >= self._next
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Log the counts gathered since the last summary"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._next = clock.monotonic() + self.interval
+        if counts:
+            self.log.info("📈 Tick summary", extra={'fields': dict(sorted(counts.items()))})
+
+
+def configure_logging(level=logging.INFO, event_sample_rate=0.0, stream=None, queue_size=10000):
+    """
+    Send daemon logs through a non-blocking queue to stream (stdout by default).
+    event_sample_rate is the fraction of per-hero events logged (0 turns them off).
+    Returns the queue handler; its listener is stopped (and drained) at exit.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(FORMAT))
+    log_queue = queue.Queue(queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+
+    for existing in list(logger.handlers):
+        if isinstance(existing, DroppingQueueHandler):
+            logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    # The daemon runs outside Django's request logging; don't log twice via root
+    logger.propagate = False
+
+    for existing in list(event_logger.filters):
+        event_logger.removeFilter(existing)
+    if event_sample_rate > 0:
+        event_logger.setLevel(logging.DEBUG)
+        event_logger.addFilter(SampleFilter(event_sample_rate))
+    else:
+        event_logger.setLevel(logging.WARNING)
+    return handler
@@ -0,0 +1,178 @@
+"""
+Live metrics for the healing daemon.
+Tick duration and lag go into fixed-bucket histograms, DB statements are
+counted per tick, and a snapshot is periodically written to the daemon
+status file (atomically) so the status command and the web side can read
+it without touching the Hero table.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.db import connection
+
+from hero.daemon.log import logger
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def snapshot(self):
+        labels = [f"le_{bound}" for bound in self.bounds] + ['inf']
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class DaemonMetrics:
+    def __init__(self, rate_window=60):
+        self.started = time.monotonic()
+        self.tick_duration_ms = Histogram()
+        self.tick_lag_ms = Histogram()
+        self.statements_per_tick = Histogram(bounds=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+        self.ticks = 0
+        self.statements = 0
+        self.rows_updated = 0
+        self.rate_window = rate_window
+        self._rows_window = deque()  # [[whole monotonic second, rows]]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def tick(self, lag=0.0):
+        """Measure one tick: duration, lag behind schedule and DB statements issued"""
+        statements = 0
+
+        def count_statements(execute, sql, params, many, context):
+            nonlocal statements
+            statements += 1
+            return execute(sql, params, many, context)
+
+        start = time.monotonic()
+        try:
+            with connection.execute_wrapper(count_statements):
+                yield
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                self.ticks += 1
+                self.statements += statements
+                self.tick_duration_ms.observe(duration * 1000)
+                self.tick_lag_ms.observe(max(0.0, lag) * 1000)
+                self.statements_per_tick.observe(statements)
+
+    def record_rows(self, rows):
+        """Record rows written by the daemon"""
+        if not rows:
+            return
+        second = int(time.monotonic())
+        with self._lock:
+            self.rows_updated += rows
+            if self._rows_window and self._rows_window[-1][0] == second:
+                self._rows_window[-1][1] += rows
+            else:
+                self._rows_window.append([second, rows])
+
+    def rows_per_second(self):
+        now = time.monotonic()
+        with self._lock:
+            cutoff = now - self.rate_window
+            while self._rows_window and self._rows_window[0][0] < cutoff:
+                self._rows_window.popleft()
+            rows = sum(count for _, count in self._rows_window)
+        window = min(self.rate_window, max(now - self.started, 1e-9))
+        return round(rows / window, 3)
+
+    def snapshot(self):
+        rows_per_second = self.rows_per_second()
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.monotonic() - self.started, 3),
+                'ticks': self.ticks,
+                'statements': self.statements,
+                'rows_updated': self.rows_updated,
+                'rows_per_second': rows_per_second,
+                'tick_duration_ms': self.tick_duration_ms.snapshot(),
+                'tick_lag_ms': self.tick_lag_ms.snapshot(),
+                'statements_per_tick': self.statements_per_tick.snapshot(),
+            }
+
+
+def write_status(path, snapshot):
+    """Atomically replace the status file with a snapshot"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+class StatusPublisher:
+    """Background thread refreshing the daemon status file"""
+
+    def __init__(self, path, build_snapshot, interval=2):
+        self.path = path
+        self.build_snapshot = build_snapshot
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, **extra):
+        try:
+            snapshot = self.build_snapshot()
+            snapshot.update(extra, updated_at=datetime.now().isoformat(),
+                            refresh_interval=self.interval, pid=os.getpid())
+            write_status(self.path, snapshot)
+        except Exception as e:
+            logger.warning("⚠️  Could not publish daemon status: %s", e)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+    def start(self):
+        self.publish()
+        self._thread = threading.Thread(
+            target=self._run, name='daemon-status', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval)
+        self.publish(status='stopped')
@@ -0,0 +1,170 @@
+"""
+Partitioned regen workers for running the healing daemon on many cores and hosts.
+Heroes are split by id modulo partition_count. Each partition is claimed
+through a RegenLease row; workers heartbeat their leases and a RegenWorker
+row, take over expired leases and rebalance so every live worker holds a
+fair share.
+"""
+import math
+import os
+import socket
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Mod
+
+from hero import clock
+from hero.models import Hero, RegenLease, RegenWorker, lazy_regen_enabled
+
+
+def partition_queryset(partition, partition_count):
+    """Heroes belonging to one partition"""
+    return Hero.objects.alias(
+        partition=Mod('id', partition_count)).filter(partition=partition)
+
+
+class PartitionedRegenWorker:
+    def __init__(self, partition_count, owner=None, lease_seconds=10, tick_interval=1):
+        self.partition_count = partition_count
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = timedelta(seconds=lease_seconds)
+        self.tick_interval = timedelta(seconds=tick_interval)
+        self.partitions = set()
+        self.running = False
+
+    def leases(self):
+        return RegenLease.objects.filter(partition_count=self.partition_count)
+
+    def ensure_leases(self):
+        """Create the lease rows for this partition count"""
+        RegenLease.objects.bulk_create(
+            [RegenLease(partition_count=self.partition_count, partition=partition)
+             for partition in range(self.partition_count)],
+            ignore_conflicts=True)
+
+    def heartbeat(self, now=None):
+        """Renew our leases and claim or release partitions to keep a fair share"""
+        now = now or clock.now()
+        expires_at = now + self.lease
+        leases = self.leases()
+
+        # Plain UPDATE/INSERT rather than update_or_create: a read-then-write
+        # transaction deadlocks between processes on SQLite
+        if not RegenWorker.objects.filter(owner=self.owner).update(
+                partition_count=self.partition_count, expires_at=expires_at):
+            RegenWorker.objects.bulk_create([RegenWorker(
+                owner=self.owner, partition_count=self.partition_count,
+                expires_at=expires_at)], ignore_conflicts=True)
+        live_workers = RegenWorker.objects.filter(
+            partition_count=self.partition_count, expires_at__gt=now).count()
+        fair_share = math.ceil(self.partition_count / max(live_workers, 1))
+
+        self.partitions = set(leases.filter(owner=self.owner, expires_at__gt=now).values_list(
+            'partition', flat=True))
+        leases.filter(partition__in=self.partitions, owner=self.owner).update(
+            expires_at=expires_at)
+
+        # Hand surplus partitions back so that new workers can pick them up
+        surplus = sorted(self.partitions)[fair_share:]
+        if surplus:
+            leases.filter(partition__in=surplus, owner=self.owner).update(
+                owner='', expires_at=None)
+            self.partitions.difference_update(surplus)
+
+        free = Q(expires_at__isnull=True) | Q(expires_at__lte=now)
+        for partition in leases.filter(free).values_list('partition', flat=True):
+            if len(self.partitions) >= fair_share:
+                break
+            # Conditional update: only one worker wins a free lease
+            if leases.filter(free, partition=partition).update(
+                    owner=self.owner, expires_at=expires_at):
+                self.partitions.add(partition)
+        return self.partitions
+
+    def tick(self, now=None):
+        """Regenerate every owned partition whose tick is due, at most once per interval"""
+        now = now or clock.now()
+        updated = 0
+        for partition in sorted(self.partitions):
+            with transaction.atomic():
+                # The lease row guards the tick, so a takeover never double applies it
+                due = self.leases().filter(
+                    Q(last_tick_at__isnull=True) | Q(last_tick_at__lte=now - self.tick_interval),
+                    partition=partition, owner=self.owner, expires_at__gt=now,
+                ).update(last_tick_at=now)
+                if not due:
+                    continue
+                heroes = partition_queryset(partition, self.partition_count)
+                updated += heroes.regenerate_health() + heroes.regenerate_mana()
+        return updated
+
+    def release(self):
+        """Give up all our leases"""
+        self.leases().filter(owner=self.owner).update(owner='', expires_at=None)
+        RegenWorker.objects.filter(owner=self.owner).delete()
+        self.partitions.clear()
+
+    def run(self):
+        """Heartbeat and tick until stopped"""
+        if lazy_regen_enabled():
+            print("😴 HERO_LAZY_REGEN is enabled: regeneration happens on read, nothing to do")
+            return
+        print(f"\n🎮 Regen worker {self.owner} ({self.partition_count} partitions)")
+        self.running = True
+        self.ensure_leases()
+        heartbeat_every = self.lease.total_seconds() / 3
+        next_heartbeat = 0
+        try:
+            while self.running:
+                try:
+                    if clock.monotonic() >= next_heartbeat:
+                        partitions = set(self.partitions)
+                        if self.heartbeat() != partitions:
+                            print(f"📋 {self.owner} now owns partitions {sorted(self.partitions)}")
+                        next_heartbeat = clock.monotonic() + heartbeat_every
+                    self.tick()
+                except Exception as e:
+                    print(f"⚠️  Error in regen worker {self.owner}: {e}")
+                clock.sleep(self.tick_interval.total_seconds())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.release()
+            print(f"👋 Regen worker {self.owner} released its leases")
+
+
+def run_worker(partition_count, **kwargs):
+    """Process entry point for one partitioned regen worker"""
+    PartitionedRegenWorker(partition_count, **kwargs).run()
+
+
+def run_workers(partition_count, processes, **kwargs):
+    """Run several partitioned regen workers as local processes"""
+    import multiprocessing
+
+    from hero.daemon.process import call
+
+    # Children must not inherit the parent's DB connections
+    connections.close_all()
+    workers = [
+        multiprocessing.Process(
+            target=call, args=('hero.daemon.partitioned.run_worker', partition_count),
+            kwargs=kwargs)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Workers get the same Ctrl+C and release their leases on the way out;
+        # leases of any worker that does not exit simply expire
+        for worker in workers:
+            try:
+                worker.join(5)
+            except KeyboardInterrupt:
+                pass
+            if worker.is_alive():
+                worker.terminate()
@@ -0,0 +1,17 @@
+"""
+Entry point for daemon child processes.
+Under the spawn and forkserver start methods (the default on Windows and
+macOS) a child imports its target afresh, before Django is set up, so the
+target must not import models at module level. call() sets Django up in the
+child and then runs the real target, given by its dotted path.
+"""
+import os
+
+
+def call(target, *args, **kwargs):
+    """Set up Django, then call the function at dotted path target"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game.settings')
+    import django
+    django.setup()
+    from django.utils.module_loading import import_string
+    return import_string(target)(*args, **kwargs)
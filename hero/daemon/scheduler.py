@@ -0,0 +1,111 @@
+"""
+Single-threaded regeneration scheduler for the healing daemon.
+Every regen session is an entry in a heap of due times, so one thread
+(and one DB connection) drives any number of heroes.
+"""
+import heapq
+import itertools
+import threading
+from contextlib import nullcontext
+
+from hero import clock
+from hero.daemon.log import logger
+
+
+class RegenScheduler:
+    def __init__(self, name='regen-scheduler', metrics=None):
+        self.name = name
+        # Optional DaemonMetrics measuring every tick
+        self.metrics = metrics
+        self._heap = []  # [(due, seq, key)]
+        self._entries = {}  # {key: (seq, callback)}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.running = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, delay, callback):
+        """
+        Schedule callback(key) to run after delay seconds.
+        The callback returns the delay until its next run, or None to finish.
+        Scheduling an existing key replaces its pending run.
+        """
+        with self._condition:
+            seq = next(self._counter)
+            self._entries[key] = (seq, callback)
+            heapq.heappush(self._heap, (clock.monotonic() + delay, seq, key))
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Cancel a pending run; stale heap entries are skipped lazily"""
+        with self._condition:
+            return self._entries.pop(key, None) is not None
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the scheduler thread, dropping pending runs"""
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _pop_due(self):
+        """Wait until at least one entry is due and return the due entries"""
+        with self._condition:
+            while self.running:
+                now = clock.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due_at, seq, key = heapq.heappop(self._heap)
+                    entry = self._entries.get(key)
+                    if entry and entry[0] == seq:
+                        due.append((key, seq, entry[1], due_at))
+                if due:
+                    return due
+                timeout = self._heap[0][0] - now if self._heap else None
+                clock.wait(self._condition, timeout)
+            return []
+
+    def _run(self):
+        """Main scheduler loop"""
+        while self.running:
+            for key, seq, callback, due_at in self._pop_due():
+                if not self.running:
+                    break
+                # Skip entries cancelled or replaced while earlier ones ran
+                if self._entries.get(key, (None,))[0] != seq:
+                    continue
+                measure = (self.metrics.tick(clock.monotonic() - due_at)
+                           if self.metrics else nullcontext())
+                try:
+                    with measure:
+                        next_delay = callback(key)
+                except Exception as e:
+                    logger.warning("⚠️  Scheduler callback for %s failed: %s", key, e)
+                    next_delay = None
+                with self._condition:
+                    if self._entries.get(key, (None,))[0] != seq:
+                        continue
+                    if next_delay is None:
+                        del self._entries[key]
+                    else:
+                        new_seq = next(self._counter)
+                        self._entries[key] = (new_seq, callback)
+                        heapq.heappush(
+                            self._heap, (clock.monotonic() + next_delay, new_seq, key))
@@ -0,0 +1,126 @@
+"""
+In-memory vitals table for the healing daemon.
+Hero vitals are kept as contiguous NumPy arrays (struct of arrays, sorted
+by hero id) so a regen tick is one vectorized add-and-clip over every hero
+instead of a Python loop over model instances. Only the rows a tick changed
+are written back, and each write is conditional on the row still holding
+the value the table had, so a concurrent write from a web worker is never
+overwritten; that hero is reported dirty and re-read on the next refresh.
+"""
+import numpy as np
+from django.db.models import Case, F, Q, Value, When
+
+from hero.models import Hero
+
+COLUMNS = ('id', 'current_health', 'max_health', 'current_mana', 'max_mana',
+           'health_regen_rate', 'mana_regen_rate', 'is_in_combat')
+# resource -> (current column, max column, rate array)
+RESOURCES = {
+    'health': ('current_health', 'max_health', 'health_rate'),
+    'mana': ('current_mana', 'max_mana', 'mana_rate'),
+}
+# Heroes per conditional UPDATE; keeps the statement under SQLite's 999 parameters
+FLUSH_BATCH_SIZE = 200
+
+
+class VitalsTable:
+    # One contiguous array per field, all indexed by row
+    FIELDS = ('ids', 'current_health', 'max_health', 'current_mana', 'max_mana',
+              'health_rate', 'mana_rate', 'in_combat')
+
+    def __init__(self, queryset=None):
+        self.queryset = queryset if queryset is not None else Hero.objects.all()
+        self._assign(self._fetch(self.queryset.none()))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _fetch(self, queryset):
+        rows = list(queryset.order_by('id').values_list(*COLUMNS))
+        column = dict(zip(COLUMNS, np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS)).T))
+        return {
+            'ids': column['id'],
+            'current_health': column['current_health'],
+            'max_health': column['max_health'],
+            'current_mana': column['current_mana'],
+            'max_mana': column['max_mana'],
+            'health_rate': column['health_regen_rate'],
+            'mana_rate': column['mana_regen_rate'],
+            'in_combat': column['is_in_combat'].astype(bool),
+        }
+
+    def _assign(self, arrays):
+        for field in self.FIELDS:
+            setattr(self, field, np.ascontiguousarray(arrays[field]))
+
+    def load(self):
+        """Load the vitals of every hero"""
+        self._assign(self._fetch(self.queryset))
+        return len(self)
+
+    def refresh(self, hero_ids):
+        """Re-read the given heroes, adding new ones and dropping deleted ones"""
+        hero_ids = np.unique(np.fromiter(hero_ids, dtype=np.int64))
+        if not len(hero_ids):
+            return
+        fresh = self._fetch(self.queryset.filter(id__in=hero_ids.tolist()))
+        positions = np.searchsorted(self.ids, fresh['ids'])
+        known = positions < len(self.ids)
+        known[known] = self.ids[positions[known]] == fresh['ids'][known]
+        if known.all() and len(fresh['ids']) == len(hero_ids):
+            # Common case: update existing rows in place
+            for field in self.FIELDS:
+                getattr(self, field)[positions] = fresh[field]
+            return
+        # Heroes were created or deleted: rebuild the arrays in id order
+        keep = ~np.isin(self.ids, hero_ids)
+        merged = {field: np.concatenate((getattr(self, field)[keep], fresh[field]))
+                  for field in self.FIELDS}
+        order = np.argsort(merged['ids'], kind='stable')
+        self._assign({field: array[order] for field, array in merged.items()})
+
+    def needs_regeneration(self):
+        """Whether any hero out of combat is missing health or mana"""
+        resting = ~self.in_combat
+        return bool(np.any(resting & (self.current_health < self.max_health)) or
+                    np.any(resting & (self.current_mana < self.max_mana)))
+
+    def regenerate(self, resource):
+        """
+        Apply one regen tick to the table in memory.
+        Returns the indices of the changed rows and their previous values.
+        """
+        current_name, max_name, rate_name = RESOURCES[resource]
+        current = getattr(self, current_name)
+        maximum = getattr(self, max_name)
+        changed = np.flatnonzero(~self.in_combat & (current < maximum))
+        previous = current[changed]
+        current[changed] = np.minimum(
+            previous + getattr(self, rate_name)[changed], maximum[changed])
+        return changed, previous
+
+    def flush(self, resource, changed, previous):
+        """
+        Write the changed rows back, each only if the database still holds
+        its previous value. Returns the number of rows written.
+        """
+        column = RESOURCES[resource][0]
+        ids = self.ids[changed].tolist()
+        old = previous.tolist()
+        new = getattr(self, column)[changed].tolist()
+        written = 0
+        for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+            batch = range(start, min(start + FLUSH_BATCH_SIZE, len(ids)))
+            condition = Q()
+            for i in batch:
+                condition |= Q(id=ids[i], **{column: old[i]})
+            written += Hero.objects.filter(condition).update(version=F('version') + 1, **{
+                column: Case(
+                    *[When(id=ids[i], then=Value(new[i])) for i in batch],
+                    default=F(column),
+                )})
+        return written
+
+    def tick(self, resource):
+        """Regenerate one resource for every eligible hero and flush the changes"""
+        return self.flush(resource, *self.regenerate(resource))
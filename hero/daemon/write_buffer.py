@@ -0,0 +1,142 @@
+"""
+Write-behind buffer for hero vitals.
+Vitals deltas are summed per hero in memory and flushed with one bulk_update
+per field set, in a single write transaction. Each row is written as
+"column + delta" clamped to 0..max (as Hero.apply_vitals_delta does), so a
+flush never overwrites a change made elsewhere since the hero was read. A
+flush happens at the latest max_delay seconds after the first buffered
+change, as soon as max_size heroes are pending, and on stop(), so a buffered
+value is never older than max_delay in the database.
+"""
+import threading
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from hero import clock
+from hero.daemon.log import logger
+from hero.models import VITALS_CAPS, Hero, clamped_vitals_expression
+
+
+class VitalsWriteBuffer:
+    def __init__(self, max_delay=1.0, max_size=1000):
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self.flushes = 0
+        self.rows_flushed = 0
+        self._pending = {}  # {hero_id: {field: summed delta}}
+        self._flushing = {}  # changes being written by the current flush
+        self._stamps = {}  # {hero_id: time of the last change}, as Hero.save() stamps
+        self._lock = threading.Lock()
+        # Serializes flushes so an older value never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, hero_id, **deltas):
+        """Buffer deltas to vitals fields of a hero, e.g. add(1, current_health=-5)"""
+        with self._lock:
+            changes = self._pending.setdefault(hero_id, {})
+            for field, delta in deltas.items():
+                changes[field] = changes.get(field, 0) + delta
+            self._stamps[hero_id] = clock.now()
+            full = len(self._pending) >= self.max_size
+        self._start()
+        self._dirty.set()
+        if full:
+            self.flush()
+
+    def apply(self, hero):
+        """Overlay changes not yet in the database on a hero loaded from it"""
+        with self._lock:
+            for pending in (self._flushing, self._pending):
+                for field, delta in pending.get(hero.pk, {}).items():
+                    setattr(hero, field, max(0, min(
+                        getattr(hero, field) + delta, getattr(hero, VITALS_CAPS[field]))))
+        return hero
+
+    def get(self, hero_id):
+        """Load a hero as the database will hold it after the next flush"""
+        return self.apply(Hero.objects.get(id=hero_id))
+
+    def flush(self):
+        """Write every buffered change; returns the number of heroes written"""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+                stamps, self._stamps = self._stamps, {}
+                self._dirty.clear()
+            if not self._flushing:
+                return 0
+            try:
+                # Heroes with the same changed fields share one bulk_update
+                groups = {}
+                for hero_id, changes in self._flushing.items():
+                    hero = Hero(id=hero_id, last_vitals_at=stamps[hero_id],
+                                version=F('version') + 1, **{
+                        field: clamped_vitals_expression(field, delta)
+                        for field, delta in changes.items()})
+                    groups.setdefault(tuple(sorted(changes)), []).append(hero)
+                with transaction.atomic():
+                    for fields, heroes in groups.items():
+                        Hero.objects.bulk_update(heroes, [*fields, 'last_vitals_at', 'version'])
+                self.flushes += 1
+                self.rows_flushed += len(self._flushing)
+                return len(self._flushing)
+            except Exception:
+                # Keep the changes so the next flush retries them
+                with self._lock:
+                    for hero_id, changes in self._flushing.items():
+                        pending = self._pending.setdefault(hero_id, {})
+                        for field, delta in changes.items():
+                            pending[field] = pending.get(field, 0) + delta
+                        self._stamps.setdefault(hero_id, stamps[hero_id])
+                    self._dirty.set()
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _start(self):
+        if self._thread is None and not self._stop.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name='vitals-write-buffer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                self._dirty.wait()
+                # Let changes coalesce for up to max_delay before writing;
+                # once stopping, stop() does the final flush on its own thread
+                if self._stop.wait(self.max_delay):
+                    break
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.warning("⚠️  Could not flush buffered vitals: %s", e)
+                    self._stop.wait(self.max_delay)
+        finally:
+            connection.close()
+
+    def stop(self):
+        """Stop the flush thread and write everything still buffered"""
+        self._stop.set()
+        self._dirty.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.max_delay + 5)
+        self._thread = None
+        self.flush()
+
+    def snapshot(self):
+        return {
+            'pending': len(self._pending),
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+        }
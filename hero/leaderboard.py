@@ -0,0 +1,84 @@
+"""
+Hero leaderboard, ranked by level then experience.
+Heroes are ranked on Hero.leaderboard_score, which every write of level or
+experience keeps current and which is indexed in ranking order (overall and
+per class), so a page of the top N is an index walk of N rows instead of a
+sort of the hero table. A rank is 1 + the number of heroes with a higher
+score: a COUNT over the same index, which walks only the entries above the
+hero and so is cheapest at the top. Heroes with the same score share a rank
+(1, 2, 2, 4). Pages and ranks are cached for PAGE_TTL seconds in Django's
+cache; the ranks on a page are computed from its own rows, so they always
+agree with the order shown.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from hero.class_registry import hero_classes
+from hero.models import Hero
+
+PAGE_TTL = 5
+MAX_PAGE_SIZE = 100
+
+
+def _heroes(hero_class_id=None):
+    heroes = Hero.objects.all()
+    if hero_class_id is not None:
+        heroes = heroes.filter(hero_class_id=hero_class_id)
+    return heroes
+
+
+def _heroes_above(score, hero_class_id=None):
+    return _heroes(hero_class_id).filter(leaderboard_score__gt=score).count()
+
+
+def rank_of_score(score, hero_class_id=None):
+    """1-based rank of a leaderboard score, overall or within a class"""
+    key = f'leaderboard:rank:{hero_class_id}:{score}'
+    rank = cache.get(key)
+    if rank is None:
+        rank = _heroes_above(score, hero_class_id) + 1
+        cache.set(key, rank, PAGE_TTL)
+    return rank
+
+
+def rank(hero, hero_class_id=None):
+    """1-based rank of a hero, overall or within a class"""
+    return rank_of_score(hero.leaderboard_score, hero_class_id)
+
+
+def top(limit=10, offset=0, hero_class_id=None):
+    """
+    A page of the leaderboard, as dicts with the rank, id, name, level,
+    experience and class name of each hero
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = f'leaderboard:{hero_class_id}:{offset}:{limit}'
+    page = cache.get(key)
+    if page is None:
+        # One transaction, so the first rank is counted on the rows of the page
+        with transaction.atomic():
+            rows = list(_heroes(hero_class_id).order_by('-leaderboard_score', 'id').values_list(
+                'id', 'name', 'level', 'experience', 'hero_class_id', 'leaderboard_score',
+            )[offset:offset + limit])
+            # The first row may tie with heroes on earlier pages; the heroes
+            # above it all come before it, so this counts at most offset entries
+            first_rank = _heroes_above(rows[0][-1], hero_class_id) + 1 if rows else None
+        page = []
+        for position, (hero_id, name, level, experience, class_id, score) in enumerate(rows):
+            if not page:
+                row_rank = first_rank
+            elif rows[position - 1][-1] == score:
+                row_rank = page[-1]['rank']
+            else:
+                # Every hero before this row has a higher score
+                row_rank = offset + position + 1
+            page.append({
+                'rank': row_rank,
+                'id': hero_id,
+                'name': name,
+                'level': level,
+                'experience': experience,
+                'hero_class': hero_classes.get(class_id).name,
+            })
+        cache.set(key, page, PAGE_TTL)
+    return page
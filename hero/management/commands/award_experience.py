@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hero.models import Hero
+
+
+class Command(BaseCommand):
+    help = 'Award experience to many heroes at once, levelling them up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('amount', type=int, help='XP to award to each hero')
+        parser.add_argument('--heroes', type=int, nargs='+',
+                            help='Hero IDs to award (default: every hero)')
+        parser.add_argument('--out-of-combat', action='store_true',
+                            help='Only award heroes that are not in combat')
+
+    def handle(self, *args, **options):
+        heroes = Hero.objects.all()
+        if options['heroes']:
+            heroes = heroes.filter(id__in=options['heroes'])
+        if options['out_of_combat']:
+            heroes = heroes.filter(is_in_combat=False)
+
+        started = time.monotonic()
+        try:
+            awarded, leveled_up = heroes.award_experience(options['amount'])
+        except ValueError as e:
+            raise CommandError(e)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"⭐ Awarded {options['amount']} XP to {awarded} heroes, "
+            f"{leveled_up} leveled up ({elapsed:.2f}s)"))
@@ -0,0 +1,218 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from hero.clock import SimulatedClock, SystemClock, use_clock
+from hero.daemon.log import configure_logging
+from hero.models import Hero, HeroClass
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Seeded heroes are named with this prefix and deleted after the run
+HERO_PREFIX = '__benchmark__'
+MODES = ('passive', 'bulk', 'vectorized', 'time-to-full')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Create a fresh, migrated database as the test runner does, switch the
+    default connection to it, and destroy it afterwards. SQLite gets a file in
+    a temporary directory rather than the test runner's in-memory database, so
+    the daemon's threads share it and timings reflect disk writes.
+    """
+    creation = connection.creation
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = str(Path(tmp) / 'benchmark.sqlite3')
+        old_name = creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = test_name
+
+
+class ThreadSampler:
+    """Background thread recording the peak number of live threads"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='thread-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the healing daemon against synthetic heroes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--heroes', type=int, nargs='+', default=[1000],
+                            help='Hero counts to benchmark, e.g. 1000 10000 100000')
+        parser.add_argument('--mode', choices=MODES, nargs='+', default=['bulk'],
+                            help='Daemon modes to benchmark')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds to run the daemon for each benchmark')
+        parser.add_argument('--combat-ratio', type=float, default=0.1,
+                            help='Fraction of heroes seeded in combat')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--output', default='benchmark_results.jsonl',
+                            help='File the results are appended to, one JSON object per run')
+        parser.add_argument('--simulated', action='store_true',
+                            help='Run on a simulated clock: --duration is game time, fast-forwarded')
+        parser.add_argument('--verbose', action='store_true',
+                            help='Show daemon output, including every per-hero event')
+        parser.add_argument('--current-database', action='store_true',
+                            help='Run on the configured database instead of a throwaway '
+                                 'one; refused if it holds heroes other than benchmark ones')
+
+    def handle(self, *args, **options):
+        if options['verbose']:
+            configure_logging(event_sample_rate=1.0)
+        # The daemon regenerates every hero in the table, not only seeded ones
+        if options['current_database']:
+            if Hero.objects.exclude(name__startswith=HERO_PREFIX).exists():
+                raise CommandError(
+                    "The database holds real heroes, which the daemon would heal; "
+                    "run without --current-database to use a throwaway database")
+            self.run_benchmarks(options)
+            return
+        with throwaway_database():
+            self.run_benchmarks(options)
+
+    def run_benchmarks(self, options):
+        for count in options['heroes']:
+            for mode in options['mode']:
+                result = self.benchmark(mode, count, options)
+                with open(options['output'], 'a') as f:
+                    f.write(json.dumps(result) + '\n')
+                self.stdout.write(self.style.SUCCESS(
+                    f"{mode} x {count} heroes: {result['ticks_per_second']} ticks/sec, "
+                    f"tick p99 {result['tick_duration_ms']['p99']}ms, "
+                    f"{result['statements']} statements, {result['rows_updated']} rows written, "
+                    f"peak RSS {result['peak_rss_mb']}MB, {result['peak_threads']} threads"))
+        self.stdout.write(f"Results appended to {options['output']}")
+
+    def seed(self, count, combat_ratio, seed):
+        """Create count heroes with random damage, mana use and combat flags"""
+        rng = random.Random(seed)
+        hero_class, _ = HeroClass.objects.get_or_create(
+            name=f'{HERO_PREFIX}class', defaults={'description': 'Benchmark heroes'})
+        now = timezone.now()
+        heroes = [
+            Hero(name=f'{HERO_PREFIX}{i}', hero_class=hero_class,
+                 constitution=rng.randint(5, 30), intelligence=rng.randint(5, 30),
+                 current_health=rng.randint(1, 100), current_mana=rng.randint(0, 50),
+                 is_in_combat=rng.random() < combat_ratio, last_vitals_at=now)
+            for i in range(count)
+        ]
+        # bulk_create skips save(), which maintains the stored regen rates
+        for hero in heroes:
+            hero.update_derived_stats()
+        Hero.objects.bulk_create(heroes, batch_size=1000)
+
+    def cleanup(self):
+        Hero.objects.filter(name__startswith=HERO_PREFIX).delete()
+        HeroClass.objects.filter(name__startswith=HERO_PREFIX).delete()
+
+    def benchmark(self, mode, count, options):
+        from healing_daemon import HealingDaemon
+
+        self.cleanup()
+        started = time.monotonic()
+        self.seed(count, options['combat_ratio'], options['seed'])
+        seed_seconds = time.monotonic() - started
+
+        sink = sys.stdout if options['verbose'] else open(os.devnull, 'w')
+        clock = SimulatedClock() if options['simulated'] else SystemClock()
+        try:
+            with tempfile.TemporaryDirectory() as tmp, ThreadSampler() as threads, \
+                    override_settings(HERO_LAZY_REGEN=mode == 'time-to-full'), \
+                    use_clock(clock), redirect_stdout(sink):
+                tmp = Path(tmp)
+                # Keep clear of the socket, state and status files of a real daemon
+                daemon = HealingDaemon(state_file=tmp / 'healing_state.json')
+                daemon.command_address = tmp / 'healing_daemon.sock'
+                daemon.spool_file = tmp / 'daemon_commands.jsonl'
+                daemon.status_file = tmp / 'daemon_status.json'
+
+                # Polls in real time, so it never moves a simulated clock itself
+                end = clock.monotonic() + options['duration']
+
+                def stop_after_duration():
+                    while clock.monotonic() < end:
+                        time.sleep(0.01)
+                    daemon.running = False
+                    daemon.wakeup.set()
+
+                threading.Thread(target=stop_after_duration, daemon=True).start()
+                started, clock_started = time.monotonic(), clock.monotonic()
+                daemon.run_passive_mode(bulk=mode == 'bulk', vectorized=mode == 'vectorized')
+                elapsed = time.monotonic() - started
+                clock_elapsed = clock.monotonic() - clock_started
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
+            self.cleanup()
+
+        metrics = daemon.metrics.snapshot()
+        percentiles = ('p50', 'p95', 'p99', 'max')
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'mode': mode,
+            'heroes': count,
+            'combat_ratio': options['combat_ratio'],
+            'clock': 'simulated' if options['simulated'] else 'system',
+            'duration_seconds': round(elapsed, 3),
+            'clock_seconds': round(clock_elapsed, 3),
+            'seed_seconds': round(seed_seconds, 3),
+            'ticks': metrics['ticks'],
+            'ticks_per_second': round(metrics['ticks'] / elapsed, 3) if elapsed else 0,
+            'tick_duration_ms': {p: metrics['tick_duration_ms'][p] for p in percentiles},
+            'tick_lag_ms': {p: metrics['tick_lag_ms'][p] for p in percentiles},
+            'statements': metrics['statements'],
+            'statements_per_tick': metrics['statements_per_tick']['avg'],
+            'rows_updated': metrics['rows_updated'],
+            'rows_per_second': round(metrics['rows_updated'] / elapsed, 3) if elapsed else 0,
+            'write_buffer': daemon.write_buffer.snapshot(),
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_threads': threads.peak,
+        }
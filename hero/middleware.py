@@ -0,0 +1,37 @@
+"""
+Per-request loader for the session hero.
+HeroMiddleware sets request.hero to a lazy object that, on first use, loads
+the hero whose id is in the session (if it belongs to request.user) with its
+inventory and equipment joined in, in one query; hero_class comes from the
+class registry. Every later use in the same request reuses that instance.
+request.hero is falsy when no hero is selected or it no longer exists.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from hero.models import Hero
+
+
+def load_hero(request):
+    """The session hero with its inventory and equipment, or None"""
+    hero_id = request.session.get('hero_id')
+    if not hero_id:
+        return None
+    return Hero.objects.owned_by(request.user).select_related(
+        'inventory', 'equipment').filter(id=hero_id).first()
+
+
+def get_hero(request):
+    if not hasattr(request, '_cached_hero'):
+        request._cached_hero = load_hero(request)
+    return request._cached_hero
+
+
+class HeroMiddleware:
+    """Expose the session hero as request.hero; goes after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.hero = SimpleLazyObject(lambda: get_hero(request))
+        return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0011_alter_hero_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='last_vitals_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
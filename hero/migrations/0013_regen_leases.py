@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0012_hero_last_vitals_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegenWorker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=200, unique=True)),
+                ('partition_count', models.IntegerField()),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RegenLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partition_count', models.IntegerField()),
+                ('partition', models.IntegerField()),
+                ('owner', models.CharField(blank=True, max_length=200)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('last_tick_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('partition_count', 'partition')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0013_regen_leases'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hero',
+            index=models.Index(condition=models.Q(('current_health__lt', models.F('max_health')), ('is_in_combat', False)), fields=['id'], name='hero_health_regen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hero',
+            index=models.Index(condition=models.Q(('current_mana__lt', models.F('max_mana')), ('is_in_combat', False)), fields=['id'], name='hero_mana_regen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hero',
+            index=models.Index(fields=['is_in_combat', 'id'], name='hero_combat_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0014_regen_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
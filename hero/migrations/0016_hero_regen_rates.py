@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:24
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+
+def regeneration_rate(stat):
+    # Hero.health/mana_regeneration_rate as of this migration
+    return Case(
+        When(**{f'{stat}__lte': 10}, then=Value(5)),
+        default=Value(5) + (F(stat) - 10) / 2,
+        output_field=models.IntegerField(),
+    )
+
+
+def fill_regen_rates(apps, schema_editor):
+    Hero = apps.get_model('hero', 'Hero')
+    Hero.objects.update(health_regen_rate=regeneration_rate('constitution'),
+                        mana_regen_rate=regeneration_rate('intelligence'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0015_hero_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='health_regen_rate',
+            field=models.IntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name='hero',
+            name='mana_regen_rate',
+            field=models.IntegerField(default=5),
+        ),
+        migrations.RunPython(fill_regen_rates, migrations.RunPython.noop),
+    ]
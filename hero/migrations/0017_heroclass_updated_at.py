@@ -0,0 +1,18 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0016_hero_regen_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='heroclass',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=timezone.now),
+            preserve_default=False,
+        ),
+    ]
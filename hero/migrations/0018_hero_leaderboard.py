@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:29
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_leaderboard_scores(apps, schema_editor):
+    Hero = apps.get_model('hero', 'Hero')
+    Hero.objects.update(leaderboard_score=F('level') * (1 << 32) + F('experience'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hero', '0017_heroclass_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='leaderboard_score',
+            field=models.BigIntegerField(default=4294967296),
+        ),
+        migrations.RunPython(fill_leaderboard_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='hero',
+            index=models.Index(fields=['-leaderboard_score', 'id'], name='hero_leaderboard_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hero',
+            index=models.Index(fields=['hero_class', '-leaderboard_score', 'id'], name='hero_class_leaderboard_idx'),
+        ),
+    ]
@@ -1,8 +1,171 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db import transaction
+from django.db.models.functions import Greatest, Least
 
+from hero import clock
 from item.models import InventoryItem
 
 
+# Regeneration rates are expressed per tick of this length
+REGEN_TICK = timedelta(seconds=1)
+
+
+def lazy_regen_enabled():
+    """Whether HP/MP regeneration is computed on read instead of by the daemon"""
+    return getattr(settings, 'HERO_LAZY_REGEN', False)
+
+
+def regen_ticks(since, now):
+    """Whole regen ticks elapsed from since to now"""
+    return max(0, int((now - since) / REGEN_TICK))
+
+
+def regen_full_at(current, maximum, rate, as_of):
+    """Time at which a resource regenerating rate per REGEN_TICK from as_of is full"""
+    if current >= maximum:
+        return as_of
+    ticks = -(-(maximum - current) // rate)
+    return as_of + ticks * REGEN_TICK
+
+
+# Fields lazy regeneration reads; it is only applied when all are loaded
+LAZY_VITALS_FIELDS = frozenset((
+    'current_health', 'max_health', 'current_mana', 'max_mana',
+    'health_regen_rate', 'mana_regen_rate', 'is_in_combat', 'last_vitals_at'))
+
+# Vitals changed by deltas (Hero.apply_vitals_delta), and the field capping each
+VITALS_CAPS = {'current_health': 'max_health', 'current_mana': 'max_mana'}
+
+
+def clamped_vitals_expression(field, delta):
+    """SQL expression adding delta to a vitals column, clamped between 0 and its cap"""
+    return Greatest(Value(0), Least(F(field) + delta, F(VITALS_CAPS[field])))
+
+
+# XP needed to advance from level n is XP_PER_LEVEL * n (experience counts
+# towards the next level and restarts from the remainder on a level up)
+XP_PER_LEVEL = 100
+# Heroes per UPDATE when awarding experience; keeps id lists under SQLite's 999 parameters
+LEVEL_UP_BATCH_SIZE = 900
+
+# Heroes rank by level, then experience: score = level * LEVEL_SCORE_WEIGHT + experience
+LEVEL_SCORE_WEIGHT = 1 << 32
+
+# Hero fields the stored derived stats (regen rates, max_health) depend on
+DERIVED_STAT_FIELDS = ('constitution', 'intelligence', 'level', 'hero_class_id')
+
+
+def regeneration_rate(stat):
+    """Regen per tick for a constitution (health) or intelligence (mana) score"""
+    if stat <= 10:
+        return 5  # Base regen rate
+    # +1 regen per 2 points above 10
+    return 5 + (stat - 10) // 2
+
+
+class VersionConflict(Exception):
+    """A compare-and-swap update of a hero kept losing to concurrent writes"""
+
+
+class HeroQuerySet(models.QuerySet):
+    # The filters below match the conditions of the partial regen indexes
+    # (see Hero.Meta); keep them in sync so the indexes stay usable
+
+    def needing_health(self):
+        """Heroes out of combat and missing health"""
+        return self.filter(is_in_combat=False, current_health__lt=F('max_health'))
+
+    def needing_mana(self):
+        """Heroes out of combat and missing mana"""
+        return self.filter(is_in_combat=False, current_mana__lt=F('max_mana'))
+
+    def needing_regeneration(self):
+        """Heroes out of combat and missing health or mana"""
+        # One subquery per resource so each is answered from its partial index
+        return self.filter(Q(id__in=self.needing_health().values('id')) |
+                           Q(id__in=self.needing_mana().values('id')))
+
+    def regenerate_health(self):
+        """Apply one health regen tick to every eligible hero in a single UPDATE"""
+        return self.needing_health().update(current_health=Least(
+            F('current_health') + F('health_regen_rate'), F('max_health')),
+            version=F('version') + 1)
+
+    def regenerate_mana(self):
+        """Apply one mana regen tick to every eligible hero in a single UPDATE"""
+        return self.needing_mana().update(current_mana=Least(
+            F('current_mana') + F('mana_regen_rate'), F('max_mana')),
+            version=F('version') + 1)
+
+    def owned_by(self, user):
+        """Heroes of a user's account; anonymous visitors share the unowned guest heroes"""
+        if user is not None and user.is_authenticated:
+            return self.filter(owner=user)
+        return self.filter(owner__isnull=True)
+
+    def keyset_page(self, after=None, size=24):
+        """
+        One page of heroes in id order, starting after hero id `after`. Keyset
+        pagination: every page is an index range read, however deep it is.
+        Returns (heroes, the `after` of the next page or None on the last page).
+        """
+        heroes = self.order_by('id')
+        if after is not None:
+            heroes = heroes.filter(id__gt=after)
+        heroes = list(heroes[:size + 1])
+        return heroes[:size], heroes[size - 1].id if len(heroes) > size else None
+
+    def award_experience(self, amount):
+        """
+        Award amount XP to every hero in the queryset, resolving any number of
+        level-ups per hero. Heroes staying on their level get one UPDATE; only
+        the heroes levelling up are loaded and levelled in Python (max_health
+        is recomputed and the gain healed). Those ending with the same values
+        share an UPDATE, so an award costs a handful of statements.
+        Returns (heroes awarded, heroes levelled up).
+        """
+        if amount <= 0:
+            raise ValueError("Experience awards must be positive")
+        levels_up = Q(experience__gte=F('level') * XP_PER_LEVEL - amount)
+        with transaction.atomic():
+            # Loaded before the UPDATE below changes whom levels_up matches
+            heroes = list(self.filter(levels_up).select_for_update().only(
+                'id', 'level', 'experience', 'max_health', 'current_health', 'hero_class_id',
+                'constitution', 'intelligence', 'health_regen_rate', 'mana_regen_rate',
+                'leaderboard_score'))
+            awarded = self.exclude(levels_up).update(
+                experience=F('experience') + amount,
+                leaderboard_score=F('leaderboard_score') + amount, version=F('version') + 1)
+            groups = {}  # {(level, experience, max_health, health gained): [hero ids]}
+            for hero in heroes:
+                hero.experience += amount
+                while hero.experience >= hero.next_level_xp:
+                    hero.experience -= hero.next_level_xp
+                    hero.level += 1
+                old_max_health = hero.max_health
+                hero.update_derived_stats()
+                key = (hero.level, hero.experience, hero.max_health,
+                       max(0, hero.max_health - old_max_health))
+                groups.setdefault(key, []).append(hero.pk)
+            for (level, experience, max_health, gained), ids in groups.items():
+                for start in range(0, len(ids), LEVEL_UP_BATCH_SIZE):
+                    Hero.objects.filter(id__in=ids[start:start + LEVEL_UP_BATCH_SIZE]).update(
+                        level=level, experience=experience, max_health=max_health,
+                        leaderboard_score=level * LEVEL_SCORE_WEIGHT + experience,
+                        # Relative to the stored value, which may have changed since it was read
+                        current_health=Least(F('current_health') + gained, Value(max_health)),
+                        version=F('version') + 1)
+            # Sent to the daemon as one batch when the transaction commits
+            from .windows_tasks import mark_hero_dirty
+            for hero in heroes:
+                mark_hero_dirty(hero.pk)
+        return awarded + len(heroes), len(heroes)
+
+
 class Hero(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, unique=True, null=False)
@@ -20,11 +183,273 @@ class Hero(models.Model):
     current_health = models.IntegerField(default=100)
     max_mana = models.IntegerField(default=50)
     current_mana = models.IntegerField(default=50)
+    # Derived from constitution/intelligence and kept up to date by save(), so
+    # regen loops read plain columns (see update_derived_stats)
+    health_regen_rate = models.IntegerField(default=5)
+    mana_regen_rate = models.IntegerField(default=5)
 
     is_in_combat = models.BooleanField(default=False)
+    # Time at which current_health/current_mana were last persisted
+    last_vitals_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every write to the row, for compare-and-swap updates and caching
+    version = models.PositiveIntegerField(default=0)
+    # Level and experience as one indexed number, for the leaderboard (hero.leaderboard)
+    leaderboard_score = models.BigIntegerField(default=LEVEL_SCORE_WEIGHT)
 
     inventory = models.ForeignKey(
         'item.Inventory', on_delete=models.CASCADE, null=True, blank=True)
+    # Account the hero belongs to; None for guest heroes. Indexed together with
+    # the id (hero_owner_idx) so a roster page is one index range
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='heroes', db_index=False)
+
+    objects = HeroQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Partial indexes holding only the heroes eligible for regeneration,
+            # so the daemon's per-tick scans cost the number of regenerating
+            # heroes instead of the table size
+            models.Index(
+                fields=['id'], name='hero_health_regen_idx',
+                condition=Q(is_in_combat=False, current_health__lt=F('max_health'))),
+            models.Index(
+                fields=['id'], name='hero_mana_regen_idx',
+                condition=Q(is_in_combat=False, current_mana__lt=F('max_mana'))),
+            # Combat lookups, and the fallback on backends without partial indexes
+            models.Index(fields=['is_in_combat', 'id'], name='hero_combat_idx'),
+            # Leaderboard pages and ranks, overall and per class, in ranking order
+            models.Index(fields=['-leaderboard_score', 'id'], name='hero_leaderboard_idx'),
+            models.Index(fields=['hero_class', '-leaderboard_score', 'id'],
+                         name='hero_class_leaderboard_idx'),
+            models.Index(fields=['owner', 'id'], name='hero_owner_idx'),
+        ]
+
+    # Write-behind buffer (hero.daemon.write_buffer) installed by the healing
+    # daemon; vitals deltas applied in its process are then coalesced
+    vitals_write_buffer = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        hero = super().from_db(db, field_names, values)
+        if 'hero_class_id' in hero.__dict__:
+            # Serve hero.hero_class from the in-process registry instead of a query
+            from .class_registry import hero_classes
+            try:
+                cls.hero_class.field.set_cached_value(hero, hero_classes.get(hero.hero_class_id))
+            except HeroClass.DoesNotExist:
+                pass
+        if not hero.get_deferred_fields().intersection(DERIVED_STAT_FIELDS):
+            hero._derived_from = hero._derived_stat_sources()
+        if lazy_regen_enabled():
+            hero.apply_lazy_regeneration()
+        return hero
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and not LAZY_VITALS_FIELDS.isdisjoint(fields):
+            # Vitals are regenerated together or not at all
+            fields = {*fields, *LAZY_VITALS_FIELDS}
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or 'last_vitals_at' in fields:
+            # The copied vitals were regenerated on load, up to the last whole
+            # tick since the stored last_vitals_at; keeping the old
+            # _vitals_as_of would make save() count that regeneration twice
+            self.__dict__.pop('_vitals_as_of', None)
+            if lazy_regen_enabled() and not self.get_deferred_fields().intersection(
+                    LAZY_VITALS_FIELDS):
+                if self.last_vitals_at is None or self.is_in_combat:
+                    self._vitals_as_of = clock.now()
+                else:
+                    self._vitals_as_of = self.last_vitals_at + regen_ticks(
+                        self.last_vitals_at, clock.now()) * REGEN_TICK
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        if update_fields is None or not {
+                'hero_class', 'experience', *DERIVED_STAT_FIELDS}.isdisjoint(update_fields):
+            derived = self.update_derived_stats()
+        stamp = True
+        if update_fields is not None:
+            update_fields = {*update_fields, *derived, 'version'}
+            # last_vitals_at dates the stored vitals: only move it when they are
+            # written, and in lazy mode write both, so neither loses regeneration
+            stamp = not update_fields.isdisjoint(VITALS_CAPS)
+            if stamp:
+                update_fields.add('last_vitals_at')
+                if lazy_regen_enabled():
+                    update_fields.update(VITALS_CAPS)
+            kwargs['update_fields'] = update_fields
+        if stamp:
+            # Stored vitals are valid as of the time they were last regenerated
+            self.last_vitals_at = getattr(self, '_vitals_as_of', None) or clock.now()
+        if self._state.adding:
+            super().save(*args, **kwargs)
+        else:
+            # Bumped in SQL so concurrent saves never end on the same version;
+            # deferred afterwards, so it is only read back if someone uses it
+            version, self.version = self.__dict__.get('version'), F('version') + 1
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                if version is None:
+                    del self.version
+                else:
+                    self.version = version
+                raise
+            del self.version
+        if not self.get_deferred_fields().intersection(DERIVED_STAT_FIELDS):
+            self._derived_from = self._derived_stat_sources()
+
+    def _derived_stat_sources(self):
+        return tuple(getattr(self, field) for field in DERIVED_STAT_FIELDS)
+
+    def update_derived_stats(self):
+        """
+        Recompute the stored regen rates and leaderboard score, and max_health
+        when constitution, level or class changed since the hero was loaded (a
+        max_health set directly is kept otherwise). Returns the names of the
+        changed fields.
+        """
+        if self.get_deferred_fields().intersection((*DERIVED_STAT_FIELDS, 'experience')):
+            return set()
+        changed = set()
+        for field, value in (('health_regen_rate', self.health_regeneration_rate),
+                             ('mana_regen_rate', self.mana_regeneration_rate),
+                             ('leaderboard_score', self.level * LEVEL_SCORE_WEIGHT + self.experience)):
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed.add(field)
+        loaded = getattr(self, '_derived_from', None)
+        if loaded is not None and loaded != self._derived_stat_sources():
+            max_health = self.calculate_max_health()
+            if max_health != self.max_health:
+                self.max_health = max_health
+                self.current_health = min(self.current_health, max_health)
+                changed.update(('max_health', 'current_health'))
+        return changed
+
+    @property
+    def cache_key(self):
+        """Cache key for data derived from this hero; changes with every write"""
+        return f'hero:{self.pk}:{self.version}'
+
+    def update_versioned(self, change, attempts=10):
+        """
+        Optimistic read-modify-write: change(hero) is called on a fresh copy of
+        this hero, and the fields it changed are written only if the row's
+        version is still the one read; on conflict the change is retried on a
+        newer copy. No lock is held between the read and the write. Updates
+        this instance, or raises VersionConflict after `attempts` conflicts.
+        """
+        fields = [field.attname for field in self._meta.concrete_fields
+                  if not field.primary_key and field.attname != 'version']
+        for _ in range(attempts):
+            hero = Hero.objects.get(pk=self.pk)
+            before = {field: getattr(hero, field) for field in fields}
+            change(hero)
+            # Queryset updates bypass save(), which keeps the derived stats current
+            hero.update_derived_stats()
+            values = {field: getattr(hero, field) for field in fields
+                      if getattr(hero, field) != before[field]}
+            if lazy_regen_enabled():
+                # Vitals regenerated on load are only valid as of _vitals_as_of
+                values.update(current_health=hero.current_health,
+                              current_mana=hero.current_mana,
+                              last_vitals_at=hero._vitals_as_of)
+            else:
+                values['last_vitals_at'] = clock.now()
+            if Hero.objects.filter(pk=self.pk, version=hero.version).update(
+                    version=F('version') + 1, **values):
+                hero.version += 1
+                hero.last_vitals_at = values['last_vitals_at']
+                for field in (*fields, 'version'):
+                    setattr(self, field, getattr(hero, field))
+                self._derived_from = hero._derived_stat_sources()
+                if lazy_regen_enabled():
+                    self._vitals_as_of = hero._vitals_as_of
+                # Updates bypass post_save; tell the daemon as hero.signals would
+                from .windows_tasks import mark_hero_dirty
+                mark_hero_dirty(self.pk)
+                return self
+        raise VersionConflict(f"Hero {self.pk} changed concurrently {attempts} times")
+
+    def apply_vitals_delta(self, health=0, mana=0):
+        """
+        Add health/mana (negative to remove) to the stored hero, clamped between
+        0 and max, without a read-modify-write of the row: concurrent changes
+        from the daemon or other requests are never lost. Only the changed
+        columns are written. Updates this instance and returns the new
+        (current_health, current_mana).
+        """
+        deltas = {field: delta for field, delta in
+                  (('current_health', health), ('current_mana', mana)) if delta}
+        if not deltas:
+            return self.current_health, self.current_mana
+
+        def apply(hero):
+            for field, delta in deltas.items():
+                setattr(hero, field, max(0, min(
+                    getattr(hero, field) + delta, getattr(hero, VITALS_CAPS[field]))))
+
+        if lazy_regen_enabled():
+            # Stored vitals are only valid as of last_vitals_at, so the delta is
+            # applied on top of the regeneration since then, in Python
+            self.update_versioned(apply)
+        elif Hero.vitals_write_buffer is not None:
+            Hero.vitals_write_buffer.add(self.pk, **deltas)
+            apply(self)
+        else:
+            with transaction.atomic():
+                Hero.objects.filter(pk=self.pk).update(
+                    last_vitals_at=clock.now(), version=F('version') + 1,
+                    **{field: clamped_vitals_expression(field, delta)
+                       for field, delta in deltas.items()})
+                # Read back in the same transaction, which holds the row's write lock
+                self.current_health, self.current_mana, self.version = Hero.objects.filter(
+                    pk=self.pk).values_list('current_health', 'current_mana', 'version').get()
+            # Updates bypass post_save; tell the daemon as hero.signals would
+            from .windows_tasks import mark_hero_dirty
+            mark_hero_dirty(self.pk)
+        return self.current_health, self.current_mana
+
+    def apply_lazy_regeneration(self, now=None):
+        """
+        Bring current_health/current_mana up to date from the time elapsed since
+        they were stored. Only whole regen ticks are applied; the remainder is
+        kept so that repeated reads never lose or double count regeneration.
+        """
+        if self.get_deferred_fields().intersection(LAZY_VITALS_FIELDS):
+            return
+        now = now or clock.now()
+        as_of = getattr(self, '_vitals_as_of', None) or self.last_vitals_at
+        if as_of is None or self.is_in_combat:
+            self._vitals_as_of = now
+            return
+        ticks = regen_ticks(as_of, now)
+        if self.current_health < self.max_health:
+            self.current_health = min(
+                self.max_health, self.current_health + self.health_regen_rate * ticks)
+        if self.current_mana < self.max_mana:
+            self.current_mana = min(
+                self.max_mana, self.current_mana + self.mana_regen_rate * ticks)
+        self._vitals_as_of = as_of + ticks * REGEN_TICK
+
+    def vitals_full_at(self):
+        """
+        Time at which lazy regeneration brings both health and mana to full,
+        or None for heroes in combat (they do not regenerate)
+        """
+        if self.is_in_combat:
+            return None
+        as_of = getattr(self, '_vitals_as_of', None) or self.last_vitals_at or clock.now()
+        return max(
+            regen_full_at(self.current_health, self.max_health,
+                          self.health_regen_rate, as_of),
+            regen_full_at(self.current_mana, self.max_mana,
+                          self.mana_regen_rate, as_of),
+        )
 
     def calculate_max_health(self):
         """Calculate max health based on constitution, level, and class"""
@@ -42,7 +467,7 @@ class Hero(models.Model):
     @property
     def next_level_xp(self):
         """Calculate XP needed for next level"""
-        return 100 * self.level  # Simple formula: 100 XP per level
+        return XP_PER_LEVEL * self.level
 
     @property
     def experience_percentage(self):
@@ -67,30 +492,30 @@ class Hero(models.Model):
 
     @property
     def health_regeneration_rate(self):
-        """Calculate health regeneration rate based on constitution per second"""
-        if self.constitution <= 10:
-            return 5  # Base regen rate
-        else:
-            # +1 HP regen per 2 points above 10
-            return 5 + (self.constitution - 10) // 2
+        """
+        Calculate health regeneration rate based on constitution per second
+        (computed from the current stats; health_regen_rate is the stored copy)
+        """
+        return regeneration_rate(self.constitution)
 
     @property
     def mana_regeneration_rate(self):
-        """Calculate mana regeneration rate based on intelligence per second"""
-        if self.intelligence <= 10:
-            return 5  # Base regen rate
-        else:
-            # +1 MP regen per 2 points above 10
-            return 5 + (self.intelligence - 10) // 2
+        """
+        Calculate mana regeneration rate based on intelligence per second
+        (computed from the current stats; mana_regen_rate is the stored copy)
+        """
+        return regeneration_rate(self.intelligence)
 
     def take_damage(self, damage):
         """
         Deal damage to hero and start healing if not at full health
         """
-        self.current_health = max(0, self.current_health - damage)
-        self.save()
+        self.apply_vitals_delta(health=-damage)
 
         # Start healing if hero is not at full health
+        # (with lazy regen, healing happens on read and the daemon is not needed)
+        if lazy_regen_enabled():
+            return
         if self.current_health < self.max_health and self.current_health > 0:
             # Import here to avoid circular imports
             from .windows_tasks import start_hero_healing
@@ -100,9 +525,7 @@ class Hero(models.Model):
         """
         Heal hero by specified amount
         """
-        self.current_health = min(
-            self.max_health, self.current_health + amount)
-        self.save()
+        self.apply_vitals_delta(health=amount)
 
     def add_to_inventory(self, item, quantity=1):
         """Add item to hero's inventory"""
@@ -127,6 +550,37 @@ class HeroClass(models.Model):
     base_constitution = models.IntegerField(default=10)
     base_agility = models.IntegerField(default=10)
     base_intelligence = models.IntegerField(default=10)
+    # Part of the version stamp other processes use to notice edits (hero.class_registry)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+
+class RegenWorker(models.Model):
+    """Heartbeat of a live partitioned regen worker, used to share partitions fairly"""
+    owner = models.CharField(max_length=200, unique=True)
+    partition_count = models.IntegerField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.owner
+
+
+class RegenLease(models.Model):
+    """
+    Claim on one partition of heroes (hero id modulo partition_count) held by a
+    regen worker. Workers renew expires_at as a heartbeat; an expired lease can
+    be taken over by any other worker. last_tick_at makes every tick apply once.
+    """
+    partition_count = models.IntegerField()
+    partition = models.IntegerField()
+    owner = models.CharField(max_length=200, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_tick_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('partition_count', 'partition')
+
+    def __str__(self):
+        return f"{self.partition}/{self.partition_count} ({self.owner or 'free'})"
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from hero.class_registry import hero_classes
+from hero.models import Hero, HeroClass
+from hero.windows_tasks import mark_hero_dirty
+
+# Fields the healing daemon's view of a hero depends on
+VITALS_FIELDS = frozenset((
+    'current_health', 'max_health', 'current_mana', 'max_mana',
+    'constitution', 'intelligence', 'health_regen_rate', 'mana_regen_rate', 'is_in_combat',
+))
+
+
+@receiver(post_save, sender=Hero)
+def wake_daemon_for_changed_vitals(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Tell the healing daemon about heroes whose vitals changed, so it can start
+    regenerating them and keep its in-memory view up to date
+    """
+    if raw:
+        return
+    if update_fields is not None and VITALS_FIELDS.isdisjoint(update_fields):
+        return
+    mark_hero_dirty(instance.pk)
+
+
+@receiver(post_save, sender=HeroClass)
+@receiver(post_delete, sender=HeroClass)
+def invalidate_hero_classes(sender, **kwargs):
+    """Reload the class registry after a class is edited in this process"""
+    hero_classes.invalidate()
@@ -0,0 +1,705 @@
+import asyncio
+import json
+import multiprocessing
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+
+from unittest import mock, skipUnless
+
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from hero.clock import SimulatedClock, use_clock
+from hero.daemon.async_daemon import AsyncHealingDaemon
+from hero.daemon.channel import (
+    HAS_UNIX_SOCKETS, CommandServer, DaemonClient, NoReply, drain_spool, spool_commands)
+from hero.daemon.journal import SessionJournal
+from hero.daemon.log import (
+    DroppingQueueHandler, SampleFilter, TickSummary, configure_logging, event_logger, logger)
+from hero.daemon.metrics import DaemonMetrics, Histogram, StatusPublisher
+from hero.daemon.partitioned import PartitionedRegenWorker
+from hero.daemon.process import call
+from hero.daemon.scheduler import RegenScheduler
+from hero.daemon.vitals import VitalsTable
+from hero.daemon.write_buffer import VitalsWriteBuffer
+from hero import windows_tasks
+from hero.models import Hero, HeroClass
+
+
+class RegenSchedulerTest(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = RegenScheduler()
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_runs_every_session_on_one_thread(self):
+        threads = set()
+        done = threading.Event()
+        remaining = {'count': 50}
+
+        def tick(key):
+            threads.add(threading.current_thread().name)
+            remaining['count'] -= 1
+            if remaining['count'] == 0:
+                done.set()
+            return None
+
+        for hero_id in range(50):
+            self.scheduler.schedule(('health', hero_id), 0, tick)
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(threads, {'regen-scheduler'})
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_reschedules_until_callback_returns_none(self):
+        calls = []
+        done = threading.Event()
+
+        def tick(key):
+            calls.append(key)
+            if len(calls) == 3:
+                done.set()
+                return None
+            return 0.01
+
+        self.scheduler.schedule(('mana', 1), 0, tick)
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(calls, [('mana', 1)] * 3)
+        self.assertNotIn(('mana', 1), self.scheduler)
+
+    def test_cancel_prevents_pending_run(self):
+        calls = []
+        self.scheduler.schedule(('health', 1), 0.2, calls.append)
+
+        self.assertTrue(self.scheduler.cancel(('health', 1)))
+        self.assertFalse(self.scheduler.cancel(('health', 1)))
+        self.scheduler.stop()
+        self.assertEqual(calls, [])
+
+
+class SimulatedClockTest(SimpleTestCase):
+    def test_sleep_fast_forwards(self):
+        clock = SimulatedClock()
+        start = clock.now()
+        clock.sleep(3600)
+        self.assertEqual(clock.now() - start, timedelta(hours=1))
+        self.assertEqual(clock.monotonic(), 3600)
+
+    def test_waiters_wake_in_deadline_order(self):
+        # A long step lets every sleeper register before time first moves
+        clock = SimulatedClock(step=0.05)
+        woke = []
+
+        def sleeper(seconds):
+            clock.sleep(seconds)
+            woke.append((seconds, clock.monotonic()))
+
+        threads = [threading.Thread(target=sleeper, args=(s,)) for s in (300, 1, 60)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(woke, [(1, 1), (60, 60), (300, 300)])
+
+    def test_scheduler_replays_an_hour_of_ticks(self):
+        ticks = []
+        done = threading.Event()
+
+        def tick(key):
+            ticks.append(key)
+            if len(ticks) == 3600:
+                done.set()
+                return None
+            return 1
+
+        with use_clock(SimulatedClock(step=0.0001)) as clock:
+            scheduler = RegenScheduler()
+            scheduler.start()
+            self.addCleanup(scheduler.stop)
+            scheduler.schedule('hero', 1, tick)
+            self.assertTrue(done.wait(30))
+            self.assertGreaterEqual(clock.monotonic(), 3600)
+
+
+class AsyncHealingDaemonTest(TransactionTestCase):
+    def setUp(self):
+        # Creating a daemon turns notifications off for the process
+        patcher = mock.patch.object(windows_tasks, 'DAEMON_NOTIFICATIONS', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.hero = Hero.objects.create(
+            name="Async Hero", hero_class=hero_class,
+            current_health=90, current_mana=45)
+
+    async def wait_until_idle(self, daemon, timeout=2):
+        async with asyncio.timeout(timeout):
+            while daemon.healing_heroes or daemon.mana_restoring_heroes:
+                await asyncio.sleep(0.01)
+
+    async def test_regenerates_until_full(self):
+        daemon = AsyncHealingDaemon(heal_interval=0.01, mana_restore_interval=0.01)
+        daemon.running = True
+        await daemon.scan()
+        self.assertIn(self.hero.id, daemon.healing_heroes)
+        self.assertIn(self.hero.id, daemon.mana_restoring_heroes)
+
+        await self.wait_until_idle(daemon)
+
+        hero = await Hero.objects.aget(id=self.hero.id)
+        self.assertEqual(hero.current_health, hero.max_health)
+        self.assertEqual(hero.current_mana, hero.max_mana)
+
+    async def test_ticks_add_deltas_without_notifying_the_sync_daemon(self):
+        daemon = AsyncHealingDaemon(heal_interval=0.01)
+        self.assertFalse(windows_tasks.DAEMON_NOTIFICATIONS)
+        daemon.running = True
+        with mock.patch.object(Hero, 'asave') as asave:
+            daemon.start_hero_healing(self.hero.id)
+            await self.wait_until_idle(daemon)
+        self.assertFalse(asave.called)
+        daemon.shutdown()
+        self.assertTrue(windows_tasks.DAEMON_NOTIFICATIONS)
+        hero = await Hero.objects.aget(id=self.hero.id)
+        self.assertEqual(hero.current_health, hero.max_health)
+
+    async def test_stop_cancels_pending_timer(self):
+        daemon = AsyncHealingDaemon(heal_interval=10)
+        daemon.running = True
+        daemon.start_hero_healing(self.hero.id)
+
+        self.assertTrue(daemon.stop_hero_healing(self.hero.id))
+        self.assertFalse(daemon.stop_hero_healing(self.hero.id))
+        await asyncio.sleep(0.05)
+
+        hero = await Hero.objects.aget(id=self.hero.id)
+        self.assertEqual(hero.current_health, 90)
+
+
+class PartitionedRegenWorkerTest(TestCase):
+    def setUp(self):
+        hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.heroes = [
+            Hero.objects.create(name=f"Hero {i}", hero_class=hero_class, current_health=50)
+            for i in range(8)
+        ]
+        self.now = timezone.now()
+        self.first = PartitionedRegenWorker(4, owner='host-a:1')
+        self.second = PartitionedRegenWorker(4, owner='host-b:1')
+        self.first.ensure_leases()
+
+    def health(self):
+        return sorted(Hero.objects.values_list('current_health', flat=True))
+
+    def test_workers_share_partitions(self):
+        self.assertEqual(self.first.heartbeat(self.now), {0, 1, 2, 3})
+        self.assertEqual(self.second.heartbeat(self.now), set())
+
+        # Once the second worker is visible, the first hands over its surplus
+        self.assertEqual(self.first.heartbeat(self.now), {0, 1})
+        self.assertEqual(self.second.heartbeat(self.now), {2, 3})
+
+    def test_tick_applies_once_per_interval(self):
+        self.first.heartbeat(self.now)
+        self.assertEqual(self.first.tick(self.now), 8)
+        self.assertEqual(self.first.tick(self.now), 0)
+        self.assertEqual(self.health(), [55] * 8)
+
+    def test_expired_lease_is_taken_over_without_double_tick(self):
+        self.first.heartbeat(self.now)
+        self.first.tick(self.now)
+
+        # The first worker dies; its leases expire and the second takes over
+        later = self.now + timedelta(seconds=30)
+        self.assertEqual(self.second.heartbeat(later), {0, 1, 2, 3})
+        self.assertEqual(self.first.tick(later), 0)
+        self.second.tick(later)
+        self.second.tick(later)
+        self.assertEqual(self.health(), [60] * 8)
+
+    def test_spawned_children_set_up_django(self):
+        child = multiprocessing.get_context('spawn').Process(
+            target=call, args=('hero.models.lazy_regen_enabled',))
+        child.start()
+        child.join(60)
+        self.assertEqual(child.exitcode, 0)
+
+
+class VitalsTableTest(TestCase):
+    def setUp(self):
+        self.hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.tank = Hero.objects.create(
+            name="Tank", hero_class=self.hero_class, constitution=20, current_health=10)
+        self.mage = Hero.objects.create(
+            name="Mage", hero_class=self.hero_class, intelligence=14, current_mana=48)
+        self.fighter = Hero.objects.create(
+            name="Fighter", hero_class=self.hero_class, current_health=10, is_in_combat=True)
+        self.table = VitalsTable()
+        self.table.load()
+
+    def test_tick_matches_model_regeneration_rates(self):
+        self.assertEqual(self.table.tick('health'), 1)
+        self.assertEqual(self.table.tick('mana'), 1)
+
+        self.tank.refresh_from_db()
+        self.mage.refresh_from_db()
+        self.fighter.refresh_from_db()
+        self.assertEqual(self.tank.current_health, 10 + self.tank.health_regeneration_rate)
+        self.assertEqual(self.mage.current_mana, 50)
+        self.assertEqual(self.fighter.current_health, 10)
+
+    def test_flush_does_not_overwrite_concurrent_writes(self):
+        changed, previous = self.table.regenerate('health')
+        Hero.objects.filter(id=self.tank.id).update(current_health=1)
+
+        self.assertEqual(self.table.flush('health', changed, previous), 0)
+        self.tank.refresh_from_db()
+        self.assertEqual(self.tank.current_health, 1)
+
+    def test_refresh_updates_adds_and_drops_heroes(self):
+        Hero.objects.filter(id=self.fighter.id).update(is_in_combat=False)
+        rogue = Hero.objects.create(name="Rogue", hero_class=self.hero_class)
+        mage_id = self.mage.id
+        self.mage.delete()
+
+        self.table.refresh([self.fighter.id, rogue.id, mage_id])
+        self.assertEqual(self.table.ids.tolist(), [self.tank.id, self.fighter.id, rogue.id])
+        self.assertEqual(self.table.tick('health'), 2)
+
+    def test_needs_regeneration(self):
+        self.assertTrue(self.table.needs_regeneration())
+        self.table.tick('mana')
+        for _ in range(20):
+            self.table.tick('health')
+        self.assertFalse(self.table.needs_regeneration())
+
+
+@override_settings(HERO_LAZY_REGEN=True)
+class TimeToFullTest(TestCase):
+    def setUp(self):
+        from healing_daemon import HealingDaemon
+
+        hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.hero = Hero.objects.create(
+            name="Resting", hero_class=hero_class, current_health=50, current_mana=10)
+        self.stored_at = self.hero.last_vitals_at
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with mock.patch.object(windows_tasks, 'DAEMON_NOTIFICATIONS'):
+            self.daemon = HealingDaemon(state_file=Path(tmp.name) / 'state.json')
+        self.addCleanup(self.daemon.scheduler.stop)
+        self.daemon.checkpoint_interval = 5
+
+    def complete_at(self, seconds):
+        later = self.stored_at + timedelta(seconds=seconds)
+        with use_clock(SimulatedClock(start=later)):
+            return self.daemon._complete_regen_tick(('full', self.hero.id))
+
+    def stored(self):
+        return Hero.objects.filter(id=self.hero.id).values_list(
+            'current_health', 'current_mana').get()
+
+    def test_schedules_one_event_at_time_to_full(self):
+        self.daemon.checkpoint_interval = 60
+        with mock.patch.object(self.daemon.scheduler, 'schedule') as schedule, \
+                use_clock(SimulatedClock(start=self.stored_at)):
+            self.daemon.schedule_completions()
+
+        schedule.assert_called_once_with(
+            ('full', self.hero.id), 10.0, self.daemon._complete_regen_tick)
+
+    def test_long_regen_is_checkpointed_then_completed(self):
+        self.assertEqual(self.complete_at(6), 4.0)
+        self.assertEqual(self.stored(), (80, 40))
+        self.assertIsNone(self.complete_at(10))
+        self.assertEqual(self.stored(), (100, 50))
+
+    def test_concurrent_write_is_not_overwritten(self):
+        def damage_after_load(*args, **kwargs):
+            hero = original(*args, **kwargs)
+            Hero.objects.filter(id=self.hero.id).update(
+                current_health=1, last_vitals_at=self.stored_at + timedelta(seconds=1),
+                version=F('version') + 1)
+            return hero
+
+        original = Hero.objects.get
+        with mock.patch.object(Hero.objects, 'get', side_effect=damage_after_load):
+            self.assertEqual(self.complete_at(6), 0)
+        self.assertEqual(self.stored()[0], 1)
+
+    def test_rest_and_damage_keep_regeneration(self):
+        self.addCleanup(self.daemon.write_buffer.stop)
+        with use_clock(SimulatedClock(start=self.stored_at + timedelta(seconds=5))):
+            self.daemon.damage_hero(self.hero.id, 10)
+            self.daemon.write_buffer.flush()
+            self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 65)
+            self.daemon.rest_hero(self.hero.id)
+            self.daemon.write_buffer.flush()
+            self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 100)
+        self.assertEqual(self.stored()[0], 100)
+
+
+class VitalsWriteBufferTest(TestCase):
+    def setUp(self):
+        hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.hero = Hero.objects.create(name="Buffered", hero_class=hero_class)
+        # Flushing is driven by the tests, never by the background thread
+        self.buffer = VitalsWriteBuffer(max_delay=60, max_size=10)
+        self.addCleanup(self.buffer.stop)
+
+    def test_changes_are_coalesced_until_flushed(self):
+        for _ in range(3):
+            self.buffer.add(self.hero.id, current_health=-10)
+
+        self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 100)
+        self.assertEqual(self.buffer.get(self.hero.id).current_health, 70)
+        with self.assertNumQueries(3):  # savepoint, one UPDATE, release
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 70)
+
+    def test_flush_keeps_concurrent_changes(self):
+        self.buffer.add(self.hero.id, current_health=-10)
+        Hero.objects.filter(id=self.hero.id).update(current_health=50)
+        self.buffer.flush()
+        self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 40)
+
+    def test_flushes_when_full(self):
+        heroes = [Hero.objects.create(name=f"Hero {i}", hero_class=self.hero.hero_class)
+                  for i in range(9)]
+        for hero in [self.hero, *heroes]:
+            self.buffer.add(hero.id, current_mana=-49)
+
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(Hero.objects.filter(current_mana=1).count(), 10)
+
+    def test_heal_and_damage_use_installed_buffer(self):
+        with mock.patch.object(Hero, 'vitals_write_buffer', self.buffer):
+            self.hero.take_damage(30)
+            self.hero.heal(10)
+
+        self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 100)
+        self.buffer.stop()
+        self.assertEqual(Hero.objects.get(id=self.hero.id).current_health, 80)
+
+
+class CommandChannelTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmp.name)
+        self.address = tmp / 'daemon.sock' if HAS_UNIX_SOCKETS else ('127.0.0.1', 0)
+        self.spool_file = tmp / 'commands.jsonl'
+        self.received = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def handler(self, command):
+        if command['command'] == 'explode':
+            raise ValueError('boom')
+        if command['command'] == 'slow':
+            time.sleep(0.3)
+        self.received.append(command)
+        return command['hero_id']
+
+    def start_server(self):
+        server = CommandServer(
+            self.address, self.handler, spool_file=self.spool_file, poll_interval=0.05)
+        server.start()
+        self.addCleanup(server.stop)
+        if not HAS_UNIX_SOCKETS:
+            self.address = server._server.server_address
+        return server
+
+    def test_batch_is_acknowledged_per_command(self):
+        self.start_server()
+        client = DaemonClient(self.address)
+        self.addCleanup(client.close)
+
+        acks = client.send([
+            {'command': 'start_healing', 'hero_id': 1},
+            {'command': 'explode', 'hero_id': 2},
+            {'command': 'stop_healing', 'hero_id': 3},
+        ])
+
+        self.assertEqual(acks[0], {'ok': True, 'result': 1})
+        self.assertEqual(acks[1], {'ok': False, 'error': 'boom'})
+        self.assertEqual(acks[2], {'ok': True, 'result': 3})
+        self.assertEqual([c['hero_id'] for c in self.received], [1, 3])
+
+    def test_client_reuses_connection(self):
+        self.start_server()
+        client = DaemonClient(self.address)
+        self.addCleanup(client.close)
+
+        client.send([{'command': 'start_healing', 'hero_id': 1}])
+        sock = client._sock
+        client.send([{'command': 'start_healing', 'hero_id': 2}])
+        self.assertIs(client._sock, sock)
+
+    def test_unacknowledged_batch_is_neither_resent_nor_spooled(self):
+        self.start_server()
+        client = DaemonClient(self.address, timeout=0.1)
+        self.addCleanup(client.close)
+
+        with mock.patch.object(windows_tasks, '_client', client), \
+                mock.patch.object(windows_tasks, 'DAEMON_COMMANDS_FILE', self.spool_file):
+            with self.assertRaises(NoReply):
+                windows_tasks.send_daemon_commands([{'command': 'slow', 'hero_id': 1}])
+        time.sleep(0.5)
+        self.assertEqual([c['hero_id'] for c in self.received], [1])
+        self.assertFalse(self.spool_file.exists())
+
+    @skipUnless(HAS_UNIX_SOCKETS, 'restarts on the same address')
+    def test_client_reconnects_to_restarted_daemon(self):
+        server = self.start_server()
+        client = DaemonClient(self.address)
+        self.addCleanup(client.close)
+        client.send([{'command': 'start_healing', 'hero_id': 1}])
+        server.stop()
+        self.start_server()
+
+        client.send([{'command': 'start_healing', 'hero_id': 2}])
+        self.assertEqual([c['hero_id'] for c in self.received], [1, 2])
+
+    def test_spooled_commands_run_when_server_starts(self):
+        with self.assertRaises(OSError):
+            DaemonClient(self.address).send([{'command': 'start_healing', 'hero_id': 1}])
+        spool_commands(self.spool_file, [{'command': 'start_healing', 'hero_id': 1}])
+
+        self.start_server()
+
+        self.assertEqual([c['hero_id'] for c in self.received], [1])
+        self.assertEqual(drain_spool(self.spool_file), [])
+
+
+class DaemonMetricsTest(TestCase):
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for value in [0.5] * 90 + [40] * 9 + [3000]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(0.5), 1)
+        self.assertEqual(histogram.percentile(0.95), 50)
+        self.assertEqual(histogram.percentile(1), 3000)
+        self.assertEqual(histogram.snapshot()['max'], 3000)
+
+    def test_tick_counts_statements(self):
+        metrics = DaemonMetrics()
+        with metrics.tick(lag=0.25):
+            Hero.objects.regenerate_health()
+            Hero.objects.regenerate_mana()
+        metrics.record_rows(7)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['ticks'], 1)
+        self.assertEqual(snapshot['statements'], 2)
+        self.assertEqual(snapshot['rows_updated'], 7)
+        self.assertEqual(snapshot['tick_lag_ms']['max'], 250)
+
+    def test_published_status_is_read_back_and_goes_stale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            status_file = Path(tmp) / 'status.json'
+            publisher = StatusPublisher(
+                status_file, lambda: {'status': 'running', 'healing_heroes': [3]})
+            publisher.publish()
+
+            with mock.patch.object(windows_tasks, 'DAEMON_STATUS_FILE', status_file):
+                status = windows_tasks.get_daemon_status()
+                self.assertEqual(status['status'], 'running')
+                self.assertEqual(status['healing_heroes'], [3])
+
+                publisher.interval = -1
+                publisher.publish()
+                self.assertEqual(windows_tasks.get_daemon_status()['status'], 'stale')
+
+
+class SessionJournalTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state_file = Path(self.tmp.name) / 'healing_state.json'
+        self.at = datetime(2025, 1, 1, 12, 0)
+
+    def journal(self, **kwargs):
+        journal = SessionJournal(self.state_file, **kwargs)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_replays_health_and_mana_sessions(self):
+        journal = self.journal()
+        journal.record('start', 'health', 1, self.at)
+        journal.record('start', 'mana', 1, self.at)
+        journal.record('start', 'health', 2, self.at)
+        journal.record('stop', 'health', 1)
+
+        sessions = self.journal().load()
+        self.assertEqual(sessions, {'health': {2: self.at}, 'mana': {1: self.at}})
+
+    def test_compaction_writes_snapshot_and_empties_journal(self):
+        journal = self.journal(compact_after=2)
+        self.assertFalse(journal.record('start', 'health', 1, self.at))
+        self.assertTrue(journal.record('start', 'health', 2, self.at))
+        journal.compact({'health': {1: self.at, 2: self.at}, 'mana': {}})
+        journal.record('stop', 'health', 1)
+
+        self.assertEqual(len(journal.journal_file.read_text().splitlines()), 1)
+        self.assertEqual(self.journal().load()['health'], {2: self.at})
+
+    def test_ignores_torn_record(self):
+        journal = self.journal()
+        journal.record('start', 'health', 1, self.at)
+        with open(journal.journal_file, 'a') as f:
+            f.write('{"op":"start","resou')
+
+        self.assertEqual(self.journal().load()['health'], {1: self.at})
+
+    def test_loads_legacy_state_file(self):
+        self.state_file.write_text(json.dumps(
+            {'5': {'last_heal': self.at.isoformat(), 'active': True}}))
+
+        self.assertEqual(self.journal().load(), {'health': {5: self.at}, 'mana': {}})
+
+
+class DirtyHeroNotificationTest(TestCase):
+    def setUp(self):
+        self.hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        patcher = mock.patch.object(windows_tasks, 'DAEMON_NOTIFICATIONS', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_changed_heroes_are_sent_in_one_frame_after_commit(self):
+        with mock.patch.object(windows_tasks._client, 'send') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = Hero.objects.create(
+                    name="First", hero_class=self.hero_class, current_health=50)
+                second = Hero.objects.create(
+                    name="Second", hero_class=self.hero_class, is_in_combat=True)
+                self.assertFalse(send.called)
+
+        send.assert_called_once_with(
+            [{'command': 'dirty', 'hero_ids': [first.id, second.id]}])
+
+    def test_saves_not_touching_vitals_are_not_reported(self):
+        hero = Hero.objects.create(name="Scholar", hero_class=self.hero_class)
+        with mock.patch.object(windows_tasks._client, 'send') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                hero.experience = 10
+                hero.save(update_fields=['experience'])
+
+        self.assertFalse(send.called)
+
+    def test_daemon_wakes_for_dirty_heroes(self):
+        from healing_daemon import HealingDaemon
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        daemon = HealingDaemon(state_file=Path(tmp.name) / 'state.json')
+        self.addCleanup(daemon.scheduler.stop)
+        self.assertFalse(windows_tasks.DAEMON_NOTIFICATIONS)
+
+        daemon.handle_command({'command': 'dirty', 'hero_ids': [3, 4]})
+        self.assertTrue(daemon.wakeup.is_set())
+        self.assertEqual(daemon.take_dirty_heroes(), {3, 4})
+        self.assertFalse(daemon.wakeup.is_set())
+        self.assertEqual(daemon.take_dirty_heroes(), set())
+
+
+    def test_set_based_modes_only_mark_heroes_dirty(self):
+        from healing_daemon import HealingDaemon
+
+        hero = Hero.objects.create(name="Bruised", hero_class=self.hero_class, current_health=50)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        state_file = Path(tmp.name) / 'state.json'
+        SessionJournal(state_file).compact({'health': {hero.id: timezone.now()}, 'mana': {}})
+        daemon = HealingDaemon(state_file=state_file)
+        self.addCleanup(daemon.scheduler.stop)
+        self.addCleanup(daemon.write_buffer.stop)
+        daemon.mode = 'bulk'
+
+        daemon.resume_sessions()
+        self.assertEqual(daemon.healing_heroes, {})
+        self.assertEqual(SessionJournal(state_file).load()['health'], {})
+        for command in ({'command': 'start_healing', 'hero_id': hero.id},
+                        {'command': 'start_mana', 'hero_id': hero.id},
+                        {'command': 'damage', 'hero_id': hero.id, 'damage': 10}):
+            daemon.handle_command(command)
+        self.assertEqual(daemon.healing_heroes, {})
+        self.assertEqual(daemon.mana_restoring_heroes, {})
+        self.assertEqual(len(daemon.scheduler), 0)
+        self.assertEqual(daemon.take_dirty_heroes(), {hero.id})
+
+
+class DaemonLogTest(SimpleTestCase):
+    def setUp(self):
+        # configure_logging changes process-wide loggers; put them back afterwards
+        state = [(log, log.level, list(log.handlers), list(log.filters), log.propagate)
+                 for log in (logger, event_logger)]
+
+        def restore():
+            for log, level, handlers, filters, propagate in state:
+                log.setLevel(level)
+                log.handlers[:] = handlers
+                log.filters[:] = filters
+                log.propagate = propagate
+        self.addCleanup(restore)
+
+    def read(self, stream, expected):
+        for _ in range(100):
+            if expected in stream.getvalue():
+                break
+            threading.Event().wait(0.01)
+        return stream.getvalue()
+
+    def test_events_are_off_by_default_and_summaries_are_logged(self):
+        stream = StringIO()
+        configure_logging(stream=stream)
+        event_logger.debug("❤️  Healed %s", 'hero')
+        logger.info("📈 Tick summary", extra={'fields': {'healed': 3}})
+
+        output = self.read(stream, 'healed=3')
+        self.assertIn('INFO hero.daemon 📈 Tick summary healed=3', output)
+        self.assertNotIn('Healed', output)
+
+    def test_sampled_events(self):
+        stream = StringIO()
+        configure_logging(event_sample_rate=1.0, stream=stream)
+        event_logger.debug("❤️  Healed %s", 'hero')
+        self.assertIn('DEBUG hero.daemon.events ❤️  Healed hero', self.read(stream, 'Healed'))
+        self.assertFalse(SampleFilter(0.0).filter(None))
+
+    def test_summary_aggregates_per_interval(self):
+        with use_clock(SimulatedClock()) as clock, \
+                mock.patch.object(logger, 'info') as info:
+            summary = TickSummary(interval=1.0)
+            for _ in range(1000):
+                summary.add('healed')
+            summary.add('mana_restored')
+            self.assertFalse(info.called)
+            clock.advance(1)
+            summary.add('healed')
+
+        info.assert_called_once_with(
+            "📈 Tick summary", extra={'fields': {'healed': 1001, 'mana_restored': 1}})
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        record = logger.makeRecord('hero.daemon', 20, __file__, 1, 'tick', (), None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
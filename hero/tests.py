@@ -1,5 +1,23 @@
-from django.test import TestCase
-from hero.models import Hero, HeroClass
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from hero import leaderboard, windows_tasks
+from hero.class_registry import HeroClassRegistry, hero_classes
+from hero.clock import SimulatedClock, use_clock
+from hero.middleware import HeroMiddleware
+from hero.models import LEVEL_SCORE_WEIGHT, Hero, HeroClass, VersionConflict
 
 
 class HeroModelTest(TestCase):
@@ -65,6 +83,7 @@ class HeroModelTest(TestCase):
 
     def test_heal(self):
         self.hero.current_health = 50
+        self.hero.save()
         self.hero.heal(30)
         self.assertEqual(self.hero.current_health, 80)
         # Test that health does not exceed max health
@@ -76,6 +95,82 @@ class HeroModelTest(TestCase):
         self.hero.heal(10)
         self.assertEqual(self.hero.current_health, self.hero.max_health)
 
+    def test_apply_vitals_delta_keeps_concurrent_changes(self):
+        stale = Hero.objects.get(id=self.hero.id)
+        # Another request damages the hero after it was loaded
+        Hero.objects.filter(id=self.hero.id).update(current_health=60, current_mana=20)
+
+        self.assertEqual(stale.apply_vitals_delta(health=-15, mana=100), (45, stale.max_mana))
+        self.assertEqual(stale.current_health, 45)
+        self.hero.refresh_from_db()
+        self.assertEqual((self.hero.current_health, self.hero.current_mana), (45, stale.max_mana))
+
+    def test_apply_vitals_delta_writes_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.hero.apply_vitals_delta(mana=-5)
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE'))
+        self.assertIn('"current_mana"', update)
+        self.assertNotIn('"current_health"', update)
+        self.assertNotIn('"name"', update)
+
+    def test_every_write_bumps_version(self):
+        version = self.hero.version
+        self.hero.save()
+        self.hero.apply_vitals_delta(health=-10)
+        Hero.objects.regenerate_health()
+        self.assertEqual(Hero.objects.get(id=self.hero.id).version, version + 3)
+        self.assertEqual(self.hero.version, version + 2)
+
+    def test_update_versioned_retries_on_conflict(self):
+        calls = []
+
+        def level_up(hero):
+            calls.append(hero.level)
+            if len(calls) == 1:
+                # Another worker writes the hero between our read and write
+                Hero.objects.get(id=self.hero.id).save()
+            hero.level += 1
+            hero.constitution = 20
+
+        key = self.hero.cache_key
+        self.hero.update_versioned(level_up)
+        self.assertEqual(len(calls), 2)
+        stored = Hero.objects.get(id=self.hero.id)
+        self.assertEqual(stored.level, 2)
+        self.assertEqual(self.hero.level, 2)
+        self.assertNotEqual(self.hero.cache_key, key)
+        # Derived columns are written with the change
+        self.assertEqual(stored.max_health, 125)
+        self.assertEqual(stored.health_regen_rate, 10)
+        self.assertEqual(stored.leaderboard_score, 2 * LEVEL_SCORE_WEIGHT)
+        self.assertEqual(self.hero.max_health, 125)
+
+    def test_update_versioned_gives_up(self):
+        def always_conflict(hero):
+            Hero.objects.filter(id=hero.id).update(version=F('version') + 1)
+
+        with self.assertRaises(VersionConflict):
+            self.hero.update_versioned(always_conflict, attempts=3)
+
+    def test_derived_stats_follow_stat_changes(self):
+        hero = Hero.objects.get(id=self.hero.id)
+        hero.constitution = 15
+        hero.intelligence = 14
+        hero.save()
+
+        hero = Hero.objects.get(id=self.hero.id)
+        self.assertEqual((hero.health_regen_rate, hero.mana_regen_rate), (7, 7))
+        self.assertEqual(hero.max_health, self.hero_class.base_health + 10)
+
+    def test_derived_stats_are_not_recomputed_without_stat_changes(self):
+        Hero.objects.filter(id=self.hero.id).update(max_health=150)
+        hero = Hero.objects.get(id=self.hero.id)
+        hero.name = "Renamed"
+        # No hero_class query, and the bumped version is not read back
+        with self.assertNumQueries(1):
+            hero.save()
+        self.assertEqual(Hero.objects.get(id=self.hero.id).max_health, 150)
+
     def test_health_regeneration_rate_base(self):
         """Test base health regeneration rate for constitution <= 10"""
         self.hero.constitution = 10
@@ -133,6 +228,212 @@ class HeroModelTest(TestCase):
         self.assertEqual(str(self.hero), "Test Hero")
         self.assertEqual(str(self.hero_class), "Warrior")
 
+class HeroExperienceTest(TestCase):
+    def setUp(self):
+        self.hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+
+    def create_hero(self, name, **kwargs):
+        return Hero.objects.create(name=name, hero_class=self.hero_class, **kwargs)
+
+    def test_award_resolves_multiple_level_ups(self):
+        novice = self.create_hero("Novice", experience=10)
+        veteran = self.create_hero("Veteran", experience=90, current_health=50)
+
+        # Veteran: 90 + 250 = 340 -> level 2 (-100) -> level 3 (-200), 40 left
+        self.assertEqual(Hero.objects.award_experience(250), (2, 2))
+
+        novice.refresh_from_db()
+        veteran.refresh_from_db()
+        self.assertEqual((novice.level, novice.experience), (2, 160))
+        self.assertEqual((veteran.level, veteran.experience), (3, 40))
+        self.assertEqual(veteran.max_health, veteran.calculate_max_health())
+        # The max health gained on levelling up is healed
+        self.assertEqual(veteran.current_health, 60)
+
+    def test_heroes_staying_on_their_level_are_updated_in_sql(self):
+        heroes = [self.create_hero(f"Hero {i}", experience=i) for i in range(20)]
+        # Savepoint, level-up select, one UPDATE, release
+        with self.assertNumQueries(4):
+            self.assertEqual(Hero.objects.award_experience(50), (20, 0))
+        self.assertEqual(
+            sorted(Hero.objects.values_list('experience', flat=True)),
+            [hero.experience + 50 for hero in heroes])
+
+    def test_command(self):
+        hero = self.create_hero("Raider")
+        self.create_hero("Bystander")
+        out = StringIO()
+        call_command('award_experience', '100', '--heroes', str(hero.id), stdout=out)
+        self.assertIn('Awarded 100 XP to 1 heroes, 1 leveled up', out.getvalue())
+        self.assertEqual(Hero.objects.get(id=hero.id).level, 2)
+        self.assertEqual(Hero.objects.get(name="Bystander").level, 1)
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.warrior = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        self.mage = HeroClass.objects.create(name="Mage", description="A wise mage.")
+        self.heroes = {
+            name: Hero.objects.create(name=name, hero_class=hero_class,
+                                      level=level, experience=experience)
+            for name, hero_class, level, experience in (
+                ("Veteran", self.warrior, 5, 10),
+                ("Scholar", self.mage, 3, 250),
+                ("Rookie", self.warrior, 3, 250),
+                ("Novice", self.mage, 1, 0),
+            )
+        }
+
+    def test_top_is_an_index_walk(self):
+        plan = Hero.objects.order_by('-leaderboard_score', 'id')[:10].explain()
+        self.assertIn('hero_leaderboard_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        page = leaderboard.top(limit=3)
+        self.assertEqual([(row['rank'], row['name']) for row in page],
+                         [(1, "Veteran"), (2, "Scholar"), (2, "Rookie")])
+        # A page starting inside a tie
+        self.assertEqual([(row['rank'], row['name']) for row in leaderboard.top(limit=2, offset=2)],
+                         [(2, "Rookie"), (4, "Novice")])
+        self.assertEqual(page[0]['hero_class'], "Warrior")
+        self.assertEqual([row['name'] for row in leaderboard.top(hero_class_id=self.mage.id)],
+                         ["Scholar", "Novice"])
+
+    def test_rank_follows_experience_awards(self):
+        rookie = self.heroes["Rookie"]
+        self.assertEqual(leaderboard.rank(rookie), 2)
+        Hero.objects.filter(id=rookie.id).award_experience(500)
+        rookie.refresh_from_db()
+        self.assertEqual(leaderboard.rank(rookie), 1)
+        self.assertEqual(leaderboard.rank(self.heroes["Veteran"]), 2)
+        self.assertEqual(leaderboard.rank(self.heroes["Novice"], self.mage.id), 2)
+        with self.assertNumQueries(0):  # cached per score
+            self.assertEqual(leaderboard.rank(rookie), 1)
+
+    def test_rank_is_an_index_range_count(self):
+        plan = Hero.objects.filter(leaderboard_score__gt=0).values('id').explain()
+        self.assertIn('hero_leaderboard_idx', plan)
+        plan = Hero.objects.filter(
+            hero_class=self.mage, leaderboard_score__gt=0).values('id').explain()
+        self.assertIn('hero_class_leaderboard_idx', plan)
+
+    def test_view(self):
+        session = self.client.session
+        session['hero_id'] = self.heroes["Novice"].id
+        session.save()
+        response = self.client.get(reverse('leaderboard'), {'limit': 2})
+        self.assertEqual(response.json()['hero_rank'], 4)
+        self.assertEqual([row['name'] for row in response.json()['heroes']],
+                         ["Veteran", "Scholar"])
+        self.assertEqual(self.client.get(reverse('leaderboard'), {'limit': 'x'}).status_code, 400)
+
+
+class HeroSelectionPageTest(TestCase):
+    def setUp(self):
+        hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        Hero.objects.bulk_create([Hero(name=f"Hero {i:02}", hero_class=hero_class)
+                                  for i in range(30)])
+        hero_classes.invalidate()
+
+    def queries_for(self, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(*args, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_page_cost_does_not_depend_on_the_number_of_heroes(self):
+        self.client.get(reverse('hero_selection'))  # load the class registry
+        first, first_queries = self.queries_for(reverse('hero_selection'))
+        self.assertEqual(len(first.context['heroes']), 24)
+        self.assertContains(first, f"?after={first.context['next_after']}")
+
+        last, last_queries = self.queries_for(
+            reverse('hero_selection'), {'after': first.context['next_after']})
+        self.assertEqual(len(last.context['heroes']), 6)
+        self.assertIsNone(last.context['next_after'])
+        self.assertEqual(first_queries, last_queries)
+        self.assertLessEqual(first_queries, 2)
+
+    def test_json_pages_cover_every_hero_once(self):
+        names, after = [], None
+        while True:
+            params = {'size': 7, **({'after': after} if after else {})}
+            page = self.client.get(reverse('hero_selection_page'), params).json()
+            names += [hero['name'] for hero in page['heroes']]
+            after = page['next_after']
+            if after is None:
+                break
+        self.assertEqual(names, [f"Hero {i:02}" for i in range(30)])
+        self.assertEqual(page['heroes'][0]['hero_class'], "Warrior")
+
+
+class HeroMiddlewareTest(TestCase):
+    def setUp(self):
+        hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        self.hero = Hero.objects.create(name="Conan", hero_class=hero_class)
+        session = self.client.session
+        session['hero_id'] = self.hero.id
+        session.save()
+
+    def request(self, hero_id):
+        request = RequestFactory().get('/')
+        request.session = {'hero_id': hero_id}
+        request.user = AnonymousUser()
+        return HeroMiddleware(lambda request: request)(request)
+
+    def test_session_hero_is_loaded_once_per_request(self):
+        request = self.request(self.hero.id)
+        hero_classes.load()
+        with self.assertNumQueries(1):
+            self.assertEqual(request.hero.name, "Conan")
+            self.assertEqual(request.hero.hero_class.name, "Warrior")
+            self.assertIsNone(request.hero.inventory)
+        self.assertFalse(self.request(None).hero)
+        self.assertFalse(self.request(self.hero.id + 1).hero)
+
+    def test_hero_views_use_the_request_hero(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['hero'].id, self.hero.id)
+        self.assertEqual(
+            sum('FROM "hero_hero"' in query['sql'] for query in queries.captured_queries), 1)
+        self.hero.delete()
+        self.assertRedirects(self.client.get(reverse('home')), reverse('index'),
+                             fetch_redirect_response=False)
+
+
+class HeroOwnershipTest(TestCase):
+    def setUp(self):
+        hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        self.alice = User.objects.create_user('alice', password='secret')
+        bob = User.objects.create_user('bob', password='secret')
+        self.mine = Hero.objects.create(name="Mine", hero_class=hero_class, owner=self.alice)
+        self.theirs = Hero.objects.create(name="Theirs", hero_class=hero_class, owner=bob)
+        self.guest = Hero.objects.create(name="Guest", hero_class=hero_class)
+
+    def test_players_only_see_and_select_their_own_heroes(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('hero_selection'))
+        self.assertEqual([hero.name for hero in response.context['heroes']], ["Mine"])
+        self.assertEqual(self.client.get(
+            reverse('select_hero', args=[self.theirs.id])).status_code, 404)
+        self.assertEqual(self.client.get(
+            reverse('delete_hero', args=[self.guest.id])).status_code, 404)
+        self.client.get(reverse('select_hero', args=[self.mine.id]))
+        self.assertEqual(self.client.session['hero_id'], self.mine.id)
+
+    def test_anonymous_visitors_share_guest_heroes(self):
+        response = self.client.get(reverse('hero_selection'))
+        self.assertEqual([hero.name for hero in response.context['heroes']], ["Guest"])
+        self.assertEqual(self.client.get(
+            reverse('select_hero', args=[self.mine.id])).status_code, 404)
+
+    def test_roster_lookups_use_the_owner_index(self):
+        self.assertIn('hero_owner_idx', Hero.objects.owned_by(self.alice).explain())
+        self.assertIn('hero_owner_idx', Hero.objects.owned_by(None).explain())
+
+
 class HeroClassModelTest(TestCase):
     def setUp(self):
         self.hero_class = HeroClass.objects.create(
@@ -141,6 +442,51 @@ class HeroClassModelTest(TestCase):
     def test_str_method(self):
         self.assertEqual(str(self.hero_class), "Mage")
 
+
+class HeroClassRegistryTest(TestCase):
+    def setUp(self):
+        self.mage = HeroClass.objects.create(name="Mage", description="A wise mage.")
+
+    def test_lookups_and_hero_class_access_skip_the_database(self):
+        hero = Hero.objects.create(name="Caster", hero_class=self.mage)
+        hero_classes.all()
+        with self.assertNumQueries(1):
+            hero = Hero.objects.get(id=hero.id)
+            self.assertEqual(hero.hero_class.name, "Mage")
+            self.assertEqual(hero_classes.get(self.mage.id), self.mage)
+            self.assertEqual(hero_classes.get(name="Mage"), self.mage)
+        self.assertIsNone(hero_classes.first(name="Rogue"))
+        with self.assertRaises(HeroClass.DoesNotExist):
+            hero_classes.get(name="Rogue")
+
+    def test_edits_in_this_process_invalidate(self):
+        hero_classes.all()
+        self.mage.name = "Archmage"
+        self.mage.save()
+        self.assertEqual(hero_classes.get(self.mage.id).name, "Archmage")
+
+    def test_edits_elsewhere_are_noticed_through_the_stamp(self):
+        registry = HeroClassRegistry(check_interval=5)
+        with use_clock(SimulatedClock()) as clock:
+            registry.load()
+            # Another process renames the class: no signal here, only a newer stamp
+            HeroClass.objects.filter(id=self.mage.id).update(
+                name="Archmage", updated_at=self.mage.updated_at + timedelta(seconds=1))
+            with self.assertNumQueries(0):
+                self.assertEqual(registry.get(self.mage.id).name, "Mage")
+            clock.advance(5)
+            self.assertEqual(registry.get(self.mage.id).name, "Archmage")
+
+    def test_classes_created_elsewhere_are_found_at_once(self):
+        registry = HeroClassRegistry(check_interval=5)
+        with use_clock(SimulatedClock()):
+            registry.load()
+            HeroClass.objects.bulk_create([HeroClass(name="Rogue", description="Sneaky")])
+            rogue = HeroClass.objects.get(name="Rogue")
+            self.assertEqual(registry.get(rogue.id), rogue)
+            self.assertEqual(registry.first(name="Rogue"), rogue)
+
+
 class HeroCreationTest(TestCase):
     def test_create_hero(self):
         hero_class = HeroClass.objects.create(
@@ -156,4 +502,178 @@ class HeroCreationTest(TestCase):
         self.assertEqual(hero.strength, 10)
         self.assertEqual(hero.constitution, 10)
         self.assertEqual(hero.agility, 10)
-        self.assertEqual(hero.intelligence, 10)
\ No newline at end of file
+        self.assertEqual(hero.intelligence, 10)
+
+class HeroRegenerateTest(TestCase):
+    def setUp(self):
+        self.hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+
+    def create_hero(self, name, **kwargs):
+        return Hero.objects.create(
+            name=name, hero_class=self.hero_class, **kwargs)
+
+    def test_regenerate_health_uses_one_statement(self):
+        injured = self.create_hero("Injured", current_health=50, constitution=14)
+        almost_full = self.create_hero("Almost Full", current_health=98)
+        fighting = self.create_hero("Fighting", current_health=50, is_in_combat=True)
+        healthy = self.create_hero("Healthy")
+
+        with self.assertNumQueries(1):
+            updated = Hero.objects.regenerate_health()
+
+        self.assertEqual(updated, 2)
+        for hero in (injured, almost_full, fighting, healthy):
+            hero.refresh_from_db()
+        self.assertEqual(injured.current_health, 50 + injured.health_regeneration_rate)
+        self.assertEqual(almost_full.current_health, almost_full.max_health)
+        self.assertEqual(fighting.current_health, 50)
+        self.assertEqual(healthy.current_health, healthy.max_health)
+
+    def test_regenerate_mana_matches_regeneration_rate(self):
+        heroes = [
+            self.create_hero(f"Caster {intelligence}", current_mana=10,
+                             max_mana=100, intelligence=intelligence)
+            for intelligence in (8, 10, 11, 12, 15, 18)
+        ]
+
+        with self.assertNumQueries(1):
+            Hero.objects.regenerate_mana()
+
+        for hero in heroes:
+            hero.refresh_from_db()
+            self.assertEqual(hero.current_mana, 10 + hero.mana_regeneration_rate)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class HeroRegenIndexTest(TestCase):
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_eligibility_scans_use_partial_indexes(self):
+        self.assertIn('hero_health_regen_idx', Hero.objects.needing_health().explain())
+        self.assertIn('hero_mana_regen_idx', Hero.objects.needing_mana().explain())
+        plan = Hero.objects.needing_regeneration().explain()
+        self.assertIn('hero_health_regen_idx', plan)
+        self.assertIn('hero_mana_regen_idx', plan)
+
+    def test_regen_updates_use_partial_indexes(self):
+        with CaptureQueriesContext(connection) as queries:
+            Hero.objects.regenerate_health()
+            Hero.objects.regenerate_mana()
+        self.assertIn('hero_health_regen_idx', self.plan(queries[0]['sql']))
+        self.assertIn('hero_mana_regen_idx', self.plan(queries[1]['sql']))
+
+    def test_indexes_only_hold_eligible_heroes(self):
+        hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        Hero.objects.create(name="Injured", hero_class=hero_class, current_health=50)
+        Hero.objects.create(name="Fighting", hero_class=hero_class,
+                            current_health=50, is_in_combat=True)
+        Hero.objects.create(name="Healthy", hero_class=hero_class)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM hero_hero INDEXED BY hero_health_regen_idx '
+                           'WHERE NOT is_in_combat AND current_health < max_health')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(HERO_LAZY_REGEN=True)
+class HeroLazyRegenerationTest(TestCase):
+    def setUp(self):
+        self.hero_class = HeroClass.objects.create(
+            name="Warrior", description="A brave warrior.")
+        self.hero = Hero.objects.create(
+            name="Lazy Hero", hero_class=self.hero_class,
+            current_health=50, current_mana=10)
+        self.stored_at = self.hero.last_vitals_at
+
+    def load_at(self, seconds):
+        later = self.stored_at + timedelta(seconds=seconds)
+        with use_clock(SimulatedClock(start=later)):
+            return Hero.objects.get(id=self.hero.id)
+
+    def test_regenerates_on_read_without_writing(self):
+        hero = self.load_at(3.5)
+        self.assertEqual(hero.current_health, 50 + 3 * hero.health_regeneration_rate)
+        self.assertEqual(hero.current_mana, 10 + 3 * hero.mana_regeneration_rate)
+        self.assertEqual(
+            Hero.objects.filter(id=self.hero.id).values_list('current_health', flat=True).get(), 50)
+
+    def test_regeneration_is_capped(self):
+        hero = self.load_at(3600)
+        self.assertEqual(hero.current_health, hero.max_health)
+        self.assertEqual(hero.current_mana, hero.max_mana)
+
+    def test_no_regeneration_in_combat(self):
+        Hero.objects.filter(id=self.hero.id).update(is_in_combat=True)
+        hero = self.load_at(10)
+        self.assertEqual(hero.current_health, 50)
+
+    def test_save_keeps_partial_tick(self):
+        hero = self.load_at(2.5)
+        hero.save()
+        hero = self.load_at(3)
+        # 2 ticks persisted by the save, the half tick is not lost
+        self.assertEqual(hero.current_health, 50 + 3 * hero.health_regeneration_rate)
+
+    def test_refresh_then_save_does_not_double_count(self):
+        hero = self.load_at(2)
+        with use_clock(SimulatedClock(start=self.stored_at + timedelta(seconds=5.5))):
+            hero.refresh_from_db()
+            self.assertEqual(hero.current_health, 50 + 5 * hero.health_regeneration_rate)
+            hero.save()
+        hero = self.load_at(5.5)
+        self.assertEqual(hero.current_health, 50 + 5 * hero.health_regeneration_rate)
+
+    def test_saving_other_fields_keeps_stored_vitals_consistent(self):
+        hero = self.load_at(5)
+        hero.experience = 10
+        with use_clock(SimulatedClock(start=self.stored_at + timedelta(seconds=5))):
+            hero.save(update_fields=['experience'])
+        self.assertEqual(self.load_at(5).current_health, 50 + 5 * hero.health_regeneration_rate)
+
+        hero.save(update_fields=['current_health'])
+        hero = self.load_at(6)
+        self.assertEqual(hero.current_health, 50 + 6 * hero.health_regeneration_rate)
+        self.assertEqual(hero.current_mana, 10 + 6 * hero.mana_regeneration_rate)
+
+    def test_vitals_full_at(self):
+        # 50 HP missing at 5/tick, 40 MP missing at 5/tick
+        self.assertEqual(self.hero.vitals_full_at(), self.stored_at + timedelta(seconds=10))
+        hero = self.load_at(4.5)
+        self.assertEqual(hero.vitals_full_at(), self.stored_at + timedelta(seconds=10))
+
+    def test_take_damage_persists_regenerated_health(self):
+        with use_clock(SimulatedClock(start=self.stored_at + timedelta(seconds=2))):
+            hero = Hero.objects.get(id=self.hero.id)
+            hero.take_damage(5)
+            hero.refresh_from_db()
+        self.assertEqual(hero.current_health, 50 + 2 * hero.health_regeneration_rate - 5)
+
+
+class BenchmarkDaemonCommandTest(TestCase):
+    def test_writes_results_and_removes_seeded_heroes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'results.jsonl'
+            # Already on the test database
+            call_command('benchmark_daemon', heroes=[20], mode=['bulk'], duration=0.2,
+                         output=str(output), current_database=True, stdout=StringIO())
+            result = json.loads(output.read_text())
+
+        self.assertEqual((result['mode'], result['heroes']), ('bulk', 20))
+        self.assertGreater(result['ticks'], 0)
+        self.assertGreater(result['rows_updated'], 0)
+        self.assertIn('p99', result['tick_duration_ms'])
+        self.assertGreater(result['peak_threads'], 1)
+        self.assertFalse(Hero.objects.exists())
+        # The daemon turns notifications off while it runs, and back on at shutdown
+        self.assertTrue(windows_tasks.DAEMON_NOTIFICATIONS)
+
+    def test_refuses_to_heal_real_heroes(self):
+        hero_class = HeroClass.objects.create(name="Warrior", description="Strong fighter")
+        Hero.objects.create(name="Player", hero_class=hero_class, current_health=10)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_daemon', heroes=[20], current_database=True,
+                         stdout=StringIO())
+        self.assertEqual(Hero.objects.get().current_health, 10)
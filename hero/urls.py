@@ -7,6 +7,8 @@ urlpatterns = [
          name='create_character'),
     path('', views.index, name='index'),
     path('select-hero/', views.hero_selection_view, name='hero_selection'),
+    path('select-hero/page/', views.hero_selection_page, name='hero_selection_page'),
     path('select-hero/<int:hero_id>/', views.select_hero, name='select_hero'),
-    path('delete-hero/<int:hero_id>/', views.delete_hero, name='delete_hero')
+    path('delete-hero/<int:hero_id>/', views.delete_hero, name='delete_hero'),
+    path('leaderboard/', views.leaderboard_view, name='leaderboard'),
 ]
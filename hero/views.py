@@ -1,33 +1,65 @@
-from django.shortcuts import render, redirect
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 
+from hero import leaderboard
+from hero.class_registry import hero_classes
 from hero.models import HeroClass, Hero
 
 # Create your views here.
 
 
 def home_view(request):
-    hero_id = request.session.get('hero_id')
-    hero = Hero.objects.filter(id=hero_id).first() if hero_id else None
-    if not hero:
+    if not request.hero:
         return redirect('index')
-    return render(request, 'hero/home.html', {'hero': hero})
+    return render(request, 'hero/home.html', {'hero': request.hero})
 
 
 def character_creation_view(request):
-    classes = HeroClass.objects.all()
+    classes = hero_classes.all()
     return render(request, 'hero/character_creation.html', {'hero_classes': classes})
 
 
+# Heroes per hero selection page, and the most a JSON client may ask for
+SELECTION_PAGE_SIZE = 24
+MAX_SELECTION_PAGE_SIZE = 100
+
+
+def selection_page(user, after=None, size=SELECTION_PAGE_SIZE):
+    """A page of the user's heroes; hero_class comes from the class registry"""
+    return Hero.objects.owned_by(user).only(
+        'id', 'name', 'level', 'hero_class_id').keyset_page(after, size)
+
+
 def hero_selection_view(request):
-    heroes = Hero.objects.all()
-    return render(request, 'hero/hero_selection.html', {'heroes': heroes})
+    try:
+        after = int(request.GET['after']) if request.GET.get('after') else None
+    except ValueError:
+        after = None
+    heroes, next_after = selection_page(request.user, after)
+    return render(request, 'hero/hero_selection.html', {
+        'heroes': heroes, 'next_after': next_after, 'paged': after is not None})
+
+
+def hero_selection_page(request):
+    """A page of heroes as JSON (?after=<last id of the previous page>&size=)"""
+    try:
+        after = int(request.GET['after']) if request.GET.get('after') else None
+        size = min(max(1, int(request.GET.get('size', SELECTION_PAGE_SIZE))),
+                   MAX_SELECTION_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'after and size must be integers'}, status=400)
+    heroes, next_after = selection_page(request.user, after, size)
+    return JsonResponse({
+        'heroes': [{'id': hero.id, 'name': hero.name, 'level': hero.level,
+                    'hero_class': hero.hero_class.name} for hero in heroes],
+        'next_after': next_after,
+    })
 
 
 def index(request):
     # if a hero is created, redirect to hero selection
     # else redirect to character creation
-    hero = Hero.objects.first()
-    if hero:
+    if Hero.objects.owned_by(request.user).exists():
         return redirect('hero_selection')
     else:
         classes = HeroClass.objects.all()
@@ -35,15 +67,31 @@ def index(request):
 
 
 def select_hero(request, hero_id):
-    hero = Hero.objects.get(id=hero_id)
+    hero = get_object_or_404(Hero.objects.owned_by(request.user), id=hero_id)
     request.session['hero_id'] = hero.id
     return redirect('home')
 
 
 def delete_hero(request, hero_id):
-    hero = Hero.objects.get(id=hero_id)
+    hero = get_object_or_404(Hero.objects.owned_by(request.user), id=hero_id)
     hero.delete()
     # If the deleted hero was the current session hero, clear it
     if request.session.get('hero_id') == hero_id:
         request.session.pop('hero_id', None)
     return redirect('hero_selection')
+
+
+def leaderboard_view(request):
+    """Top heroes as JSON (?class=<id>&limit=&offset=), with the session hero's rank"""
+    try:
+        hero_class_id = int(request.GET['class']) if request.GET.get('class') else None
+        limit = int(request.GET.get('limit', 10))
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        return JsonResponse({'error': 'class, limit and offset must be integers'}, status=400)
+    hero = request.hero
+    ranked = bool(hero) and hero_class_id in (None, hero.hero_class_id)
+    return JsonResponse({
+        'heroes': leaderboard.top(limit, offset, hero_class_id),
+        'hero_rank': leaderboard.rank(hero, hero_class_id) if ranked else None,
+    })
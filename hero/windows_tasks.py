@@ -1,33 +1,61 @@
 """
 Simple healing tasks for Windows - No Django-RQ required
-Communicates with healing daemon via file-based messaging
+Communicates with healing daemon over a local socket command channel
 """
 import json
 import threading
-import time
 from datetime import datetime
 from pathlib import Path
+from django.db import transaction
+from . import clock
+from .daemon.channel import HAS_UNIX_SOCKETS, DaemonClient, NoReply, spool_commands
 from .models import Hero
 
-# Path to communicate with daemon
-DAEMON_COMMANDS_FILE = Path(__file__).parent.parent / 'daemon_commands.json'
+# Address of the daemon command channel (loopback TCP where AF_UNIX is missing)
+DAEMON_SOCKET = (Path(__file__).parent.parent / 'healing_daemon.sock'
+                 if HAS_UNIX_SOCKETS else ('127.0.0.1', 8765))
+# Commands the daemon could not receive are spooled here until it drains them
+DAEMON_COMMANDS_FILE = Path(__file__).parent.parent / 'daemon_commands.jsonl'
 DAEMON_STATUS_FILE = Path(__file__).parent.parent / 'daemon_status.json'
 
+_client = DaemonClient(DAEMON_SOCKET)
 
-def send_daemon_command(command, **kwargs):
-    """Send a command to the healing daemon"""
+# Report heroes needing regeneration to the daemon (disabled inside the daemon)
+DAEMON_NOTIFICATIONS = True
+_dirty_heroes = threading.local()
+
+
+def send_daemon_commands(commands):
+    """
+    Send a batch of commands to the healing daemon in one frame.
+    Returns the daemon's acknowledgements, or None if the commands were
+    spooled because the daemon could not be reached. Raises NoReply if they
+    were delivered but not acknowledged.
+    """
+    timestamp = clock.now().isoformat()
+    commands = [{'timestamp': timestamp, **command} for command in commands]
     try:
-        command_data = {
-            'command': command,
-            'timestamp': datetime.now().isoformat(),
-            **kwargs
-        }
+        return _client.send(commands)
+    except NoReply:
+        # They may have run: spooling them would run them again
+        raise
+    except Exception:
+        try:
+            spool_commands(DAEMON_COMMANDS_FILE, commands)
+        except Exception as e:
+            print(f"❌ Failed to send daemon commands: {e}")
+            raise
+        return None
 
-        # Write command to file
-        with open(DAEMON_COMMANDS_FILE, 'w') as f:
-            json.dump(command_data, f)
 
-        print(f"📤 Sent command to daemon: {command}")
+def send_daemon_command(command, **kwargs):
+    """Send a command to the healing daemon"""
+    try:
+        acks = send_daemon_commands([{'command': command, **kwargs}])
+        if acks is None:
+            print(f"📥 Daemon not reachable, spooled command: {command}")
+        else:
+            print(f"📤 Sent command to daemon: {command}")
         return True
 
     except Exception as e:
@@ -35,6 +63,32 @@ def send_daemon_command(command, **kwargs):
         return False
 
 
+def mark_hero_dirty(hero_id):
+    """
+    Wake the daemon for a hero that may need regeneration once the current
+    transaction commits. Heroes marked in one transaction travel in one frame.
+    """
+    if not DAEMON_NOTIFICATIONS:
+        return
+    pending = getattr(_dirty_heroes, 'ids', None)
+    if pending is None:
+        pending = _dirty_heroes.ids = set()
+    pending.add(hero_id)
+    transaction.on_commit(_notify_dirty_heroes)
+
+
+def _notify_dirty_heroes():
+    hero_ids = getattr(_dirty_heroes, 'ids', None)
+    if not hero_ids:
+        return
+    _dirty_heroes.ids = None
+    try:
+        _client.send([{'command': 'dirty', 'hero_ids': sorted(hero_ids)}])
+    except Exception:
+        # Best effort: a daemon that was down does a full sweep when it starts
+        pass
+
+
 def start_hero_healing(hero_id):
     """Start healing process for a hero via daemon"""
     return send_daemon_command('start_healing', hero_id=hero_id)
@@ -51,8 +105,7 @@ def rest_hero(hero_id):
         hero = Hero.objects.get(id=hero_id)
 
         if hero.current_health < hero.max_health:
-            hero.current_health = hero.max_health
-            hero.save()
+            hero.apply_vitals_delta(health=hero.max_health)
             print(f"💤 {hero.name} rested and is now at full health!")
 
             # Tell daemon to stop healing this hero
@@ -72,8 +125,7 @@ def damage_hero(hero_id, damage):
     try:
         hero = Hero.objects.get(id=hero_id)
         old_health = hero.current_health
-        hero.current_health = max(0, hero.current_health - damage)
-        hero.save()
+        hero.apply_vitals_delta(health=-damage)
 
         print(f"⚔️  Damaged {hero.name}: {old_health} → {hero.current_health}/{hero.max_health} HP")
 
@@ -90,8 +142,7 @@ def simple_heal_hero(hero_id, heal_amount=5):
     try:
         hero = Hero.objects.get(id=hero_id)
         old_health = hero.current_health
-        hero.current_health = min(hero.current_health + heal_amount, hero.max_health)
-        hero.save()
+        hero.apply_vitals_delta(health=heal_amount)
 
         print(f"❤️  Healed {hero.name}: {old_health} → {hero.current_health}/{hero.max_health} HP")
         return True
@@ -102,11 +153,19 @@ def simple_heal_hero(hero_id, heal_amount=5):
 
 
 def get_daemon_status():
-    """Get status from healing daemon"""
+    """Get the status snapshot published by the healing daemon"""
     try:
         if DAEMON_STATUS_FILE.exists():
             with open(DAEMON_STATUS_FILE, 'r') as f:
-                return json.load(f)
+                status = json.load(f)
+            # A running daemon refreshes the file; an old snapshot means it died.
+            # Liveness is about real processes, so this uses the wall clock
+            updated_at = datetime.fromisoformat(status['updated_at'])
+            max_age = 3 * status.get('refresh_interval', 2)
+            if status.get('status') == 'running' and \
+                    (datetime.now() - updated_at).total_seconds() > max_age:
+                status['status'] = 'stale'
+            return status
     except Exception as e:
         print(f"⚠️  Could not read daemon status: {e}")
 
@@ -120,9 +179,9 @@ def heal_hero_over_time_simple(hero_id, duration_seconds=300):
     """
     def healing_thread():
         try:
-            start_time = time.time()
+            start_time = clock.monotonic()
 
-            while (time.time() - start_time) < duration_seconds:
+            while (clock.monotonic() - start_time) < duration_seconds:
                 hero = Hero.objects.get(id=hero_id)
 
                 if hero.current_health >= hero.max_health:
@@ -134,12 +193,11 @@ def heal_hero_over_time_simple(hero_id, duration_seconds=300):
                     break
 
                 old_health = hero.current_health
-                hero.current_health = min(hero.current_health + 1, hero.max_health)
-                hero.save()
+                hero.apply_vitals_delta(health=1)
 
                 print(f"❤️  Background heal: {hero.name} {old_health} → {hero.current_health}/{hero.max_health} HP")
 
-                time.sleep(30)  # Wait 30 seconds
+                clock.sleep(30)  # Wait 30 seconds
 
         except Hero.DoesNotExist:
             print(f"❌ Hero with ID {hero_id} not found")
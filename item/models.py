@@ -112,22 +112,16 @@ class Consumable(Item):
 
     def use(self, hero):
         """Apply the consumable effect to the hero"""
-        if self.heal_amount > 0:
-            hero.current_health = min(
-                hero.current_health + self.heal_amount, hero.max_health)
-            hero.save()
-        if self.mana_restore > 0:
-            # Assuming hero has a mana attribute
-            hero.current_mana = min(
-                hero.current_mana + self.mana_restore, hero.max_mana)
-            hero.save()
+        hero.apply_vitals_delta(
+            health=max(0, self.heal_amount), mana=max(0, self.mana_restore))
 
 class Inventory(models.Model):
     id = models.AutoField(primary_key=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def all(self):
-        return InventoryItem.objects.filter(inventory=self)
+        # Served from the prefetch cache when inventoryitem_set was prefetched
+        return self.inventoryitem_set.all()
 
 class InventoryItem(models.Model):
     inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE)
@@ -1,9 +1,12 @@
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.http import HttpRequest
+from hero.class_registry import hero_classes
 from hero.models import Hero, HeroClass
-from item.models import Item, Weapon, Armor, Consumable, OffHand, Inventory
+from item.models import Item, Weapon, Armor, Consumable, OffHand, Inventory, InventoryItem
 
 
 class ItemViewTests(TestCase):
@@ -76,6 +79,31 @@ class ItemViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Inventory")
 
+    def test_inventory_view_queries_do_not_grow_with_items(self):
+        """The hero is loaded once and items are prefetched, not fetched per row"""
+        inventory = Inventory.objects.create()
+        self.hero.inventory = inventory
+        self.hero.save()
+        for item in (self.weapon, self.armor, self.consumable, self.other_item):
+            InventoryItem.objects.create(inventory=inventory, item=item)
+        session = self.client.session
+        session['hero_id'] = self.hero.id
+        session.save()
+        hero_classes.load()
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/inventory/')
+        for i in range(5):
+            weapon = Weapon.objects.create(name=f"Spare Sword {i}", value=10)
+            InventoryItem.objects.create(inventory=inventory, item=weapon)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/inventory/')
+
+        self.assertEqual(response.context['total_items'], 9)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+        self.assertEqual(
+            sum('FROM "hero_hero"' in query['sql'] for query in many.captured_queries), 1)
+
     def test_item_detail_weapon(self):
         """Test item detail view for weapon"""
         response = self.client.get(f'/item/{self.weapon.id}/')
@@ -1,7 +1,7 @@
+from django.db.models import prefetch_related_objects
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
-from django.http import JsonResponse
 
-from hero.models import Hero
 from item.models import Inventory, Item, OffHand, Weapon, Armor, Consumable
 
 # Create your views here.
@@ -90,13 +90,12 @@ def use_item_api(request, item_id):
     # Get the polymorphic item
     item = get_object_or_404(Item, id=item_id)
 
-    # Get hero from session (assuming you have hero management)
-    hero_id = request.session.get('hero_id')
-    if not hero_id:
+    # Session hero, loaded by hero.middleware.HeroMiddleware
+    if not request.session.get('hero_id'):
         return JsonResponse({'error': 'No hero selected'}, status=400)
-
-    from hero.models import Hero
-    hero = get_object_or_404(Hero, id=hero_id)
+    hero = request.hero
+    if not hero:
+        raise Http404("No hero matches the session")
 
     # Polymorphic usage - different behavior for each type!
     try:
@@ -153,20 +152,23 @@ def inventory_view(request):
     """
     Display the hero's inventory, categorized by item type.
     """
-    # Get hero from session
-    hero_id = request.session.get('hero_id')
-    if not hero_id:
+    # Session hero, loaded by hero.middleware.HeroMiddleware
+    if not request.session.get('hero_id'):
         inventory_items = []
         # For demo purposes, create mock inventory items
         for item in Item.objects.all():
             inventory_items.append(type('MockInventoryItem', (), {'item': item, 'quantity': 1})())
     else:
-        hero = get_object_or_404(Hero, id=hero_id)
+        hero = request.hero
+        if not hero:
+            raise Http404("No hero matches the session")
         inventory = hero.inventory
         if inventory is None:
             inventory_items = []
         else:
-            inventory_items = inventory.all()  # Assuming Inventory has a method to get all items
+            # One query for the rows and one per item type, instead of two per row
+            prefetch_related_objects([inventory], 'inventoryitem_set__item')
+            inventory_items = inventory.all()
 
     # Categorize items automatically using polymorphic types
     weapons = []